@@ -3,7 +3,7 @@ from uuid import UUID
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import lambda_stmt, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from virtualstack.db.base_class import Base
@@ -22,8 +22,13 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self.model = model
 
     async def get(self, db: AsyncSession, *, record_id: UUID) -> Optional[ModelType]:
-        """Get a single record by ID."""
-        query = select(self.model).where(self.model.id == record_id)
+        """Get a single record by ID.
+
+        Built as a lambda statement: this lookup runs on every request that resolves a tenant
+        (or user, role, ...) by ID, and the lambda cache skips rebuilding the SQL expression.
+        """
+        model = self.model # Lambda closures may only capture SQL elements and literal values, not self
+        query = lambda_stmt(lambda: select(model).where(model.id == record_id))
         result = await db.execute(query)
         return result.scalars().first()
 
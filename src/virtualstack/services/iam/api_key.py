@@ -36,10 +36,13 @@ class APIKeyService(CRUDBase[APIKey, APIKeyCreate, APIKeyUpdate]):
         return hashlib.sha256(key_value.encode()).hexdigest()
     # --- End Helper Methods ---
 
-    async def create_with_user(
-        self, db: AsyncSession, *, obj_in: APIKeyCreate, user_id: UUID, tenant_id: Optional[UUID] = None
+    def build_with_user(
+        self, *, obj_in: APIKeyCreate, user_id: UUID, tenant_id: Optional[UUID] = None
     ) -> tuple[APIKey, str]:
-        """Creates an API key, hashes it, and associates it with a user and optionally a tenant."""
+        """Builds an unsaved API key for a user and returns it with the raw key value.
+
+        Nothing is added to a session, so callers can persist several keys in one transaction.
+        """
         # Generate the raw key value using the internal helper method
         raw_key = self._generate_api_key()
         key_prefix = raw_key[:8]  # Use first 8 characters as prefix
@@ -79,7 +82,13 @@ class APIKeyService(CRUDBase[APIKey, APIKeyCreate, APIKeyUpdate]):
             db_obj_data["expires_at"] = None # Explicitly set to None if not provided
 
         # Create the database object directly with the prepared attributes
-        db_obj = self.model(**db_obj_data)
+        return self.model(**db_obj_data), raw_key
+
+    async def create_with_user(
+        self, db: AsyncSession, *, obj_in: APIKeyCreate, user_id: UUID, tenant_id: Optional[UUID] = None
+    ) -> tuple[APIKey, str]:
+        """Creates an API key, hashes it, and associates it with a user and optionally a tenant."""
+        db_obj, raw_key = self.build_with_user(obj_in=obj_in, user_id=user_id, tenant_id=tenant_id)
 
         try:
             db.add(db_obj)
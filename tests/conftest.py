@@ -4,7 +4,9 @@ import pytest
 from typing import Generator, Any, AsyncGenerator
 import logging
 import asyncio
-from uuid import UUID
+import hashlib
+from pathlib import Path
+from uuid import UUID, uuid4
 import alembic
 
 # Add project root to sys.path to allow absolute imports from 'src'
@@ -14,11 +16,11 @@ if project_root not in sys.path:
 
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
-from fastapi import FastAPI
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, AsyncEngine, AsyncConnection
-from sqlalchemy.orm import sessionmaker
+from fastapi import FastAPI, status
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, AsyncEngine, AsyncConnection, async_sessionmaker
+from sqlalchemy import select, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.pool import NullPool
-from sqlalchemy import text
 from sqlalchemy.schema import CreateTable, CreateSchema, DropSchema
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import ProgrammingError
@@ -42,7 +44,12 @@ os.environ["TEST_DATABASE_URL"] = "postgresql+asyncpg://testuser:testpassword@lo
 
 from virtualstack.core.config import settings
 from virtualstack.db.base import Base
-from virtualstack.core.security import create_access_token # Import token creation function
+from virtualstack.core.security import create_access_token, pwd_context # Import token creation function
+
+# Hash test passwords with the minimum bcrypt cost. Seeding users, creating users and
+# accepting invitations all hash a password, and the default cost (12) dominates those
+# tests. verify_password reads the rounds from each stored hash, so logins still work.
+pwd_context.update(bcrypt__rounds=4)
 
 # Force settings.TEST_DATABASE_URL to match the test container DSN (override pydantic default)
 settings.TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
@@ -50,9 +57,6 @@ settings.TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
 if not settings.TEST_DATABASE_URL:
     raise RuntimeError("Test database URL (TEST_DATABASE_URL) not set in environment or .env file.")
 
-test_engine = create_async_engine(str(settings.TEST_DATABASE_URL), echo=False) # Corrected: Use URL
-TestingSessionLocal = sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
-
 from virtualstack.main import app as fastapi_app # Import the app instance directly
 from virtualstack.schemas.iam.user import UserCreate  # Import UserCreate schema
 from virtualstack.services.iam import user_service, tenant_service, role_service, permission_service # Import services
@@ -61,6 +65,8 @@ from virtualstack.schemas.iam.tenant import TenantCreate # Add TenantCreate
 from virtualstack.schemas.iam.role import RoleCreate
 from virtualstack.schemas.iam.permission import PermissionCreate # Add PermissionCreate
 from virtualstack.core import permissions as core_permissions # Import the enum definition
+from virtualstack.models.iam.role_permissions import role_permissions_table
+from virtualstack.services.iam.user import DEFAULT_ROLE_NAME
 
 # Create our own login_rate_limiter for testing - a simple pass-through function
 # that doesn't actually rate limit but satisfies the dependency
@@ -71,6 +77,16 @@ async def login_rate_limiter():
 # Hardcode the schema name used by the models
 DB_SCHEMA_NAME = "iam"
 
+# Size of the session-wide asyncpg connection pool used by the test engine
+TEST_DB_POOL_SIZE = 10
+
+# Credentials for the seeded regular (non-superuser) test user
+TEST_USER2_EMAIL = "user2@virtualstack.example"
+TEST_USER2_PASSWORD = "user2password123!"
+
+# Name of the tenant admin role seed_data creates in the default tenant
+TENANT_ADMIN_ROLE_NAME = "Tenant Admin"
+
 # Configure logging for tests
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -88,29 +104,154 @@ import alembic
 # Ensure project root is defined (needed for script_location)
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
+# Opt-in local cache of the freshly migrated test DB as a PostgreSQL template database.
+# Never used on CI, where every run must exercise the migrations themselves.
+CACHE_TEST_DB = os.environ.get("CACHE_TEST_DB") == "1" and not os.environ.get("CI")
+
+# pytest-xdist worker running this process ("gw0", "gw1", ...), or "master" without -n.
+# Each worker migrates and uses its own database so workers never see each other's rows.
+TEST_WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "master")
+
+# Opt-in pyinstrument call-stack profiles for tests that request the profile_test fixture.
+# One HTML report per test is written to ./prof/ when PROFILE=1.
+PROFILE_TESTS = os.environ.get("PROFILE") == "1"
+PROFILE_OUTPUT_DIR = Path(PROJECT_ROOT) / "prof"
+
+# --- Migrated DB Template Cache ---
+
+def _migration_state_hash() -> str:
+    """Hashes the Alembic revisions and model sources that determine the migrated schema."""
+    digest = hashlib.sha256()
+    root = Path(PROJECT_ROOT)
+    sources = sorted((root / "alembic" / "versions").glob("*.py")) + sorted(
+        (root / "src" / "virtualstack" / "models").rglob("*.py")
+    )
+    for path in sources:
+        digest.update(str(path.relative_to(root)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+def _template_db_name() -> str:
+    """Name of the template database caching the current migration state (shared by all workers)."""
+    return f"{make_url(settings.TEST_DATABASE_URL).database}_tpl_{_migration_state_hash()}"
+
+def _maintenance_engine(engine: AsyncEngine) -> AsyncEngine:
+    """Engine on the server's 'postgres' DB; CREATE/DROP DATABASE cannot run inside a transaction."""
+    return create_async_engine(
+        engine.url.set(database="postgres"), isolation_level="AUTOCOMMIT", poolclass=NullPool
+    )
+
+async def _restore_test_db_from_template(engine: AsyncEngine) -> bool:
+    """Recreates the test DB from the cached template if one matches the migration hash."""
+    template_name = _template_db_name()
+    maintenance = _maintenance_engine(engine)
+    try:
+        async with maintenance.connect() as conn:
+            exists = await conn.scalar(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": template_name}
+            )
+            if not exists:
+                logger.info(f"[Test Setup] No cached template '{template_name}', running migrations.")
+                return False
+            # Nothing else may be connected to either database while it is copied
+            await engine.dispose()
+            await conn.execute(text(f'DROP DATABASE IF EXISTS "{engine.url.database}" WITH (FORCE)'))
+            await conn.execute(text(f'CREATE DATABASE "{engine.url.database}" TEMPLATE "{template_name}"'))
+            logger.info(f"[Test Setup] Test DB restored from cached template '{template_name}'.")
+            return True
+    except Exception as e:
+        # e.g. another xdist worker is copying the same template right now; just migrate
+        logger.warning(f"[Test Setup] Could not restore from template '{template_name}': {e}")
+        await _ensure_test_database(engine)
+        return False
+    finally:
+        await maintenance.dispose()
+
+async def _snapshot_test_db_to_template(engine: AsyncEngine) -> None:
+    """Copies the freshly migrated test DB into a template named after the migration hash."""
+    template_name = _template_db_name()
+    maintenance = _maintenance_engine(engine)
+    try:
+        # The source database must have no open connections while it is copied
+        await engine.dispose()
+        async with maintenance.connect() as conn:
+            # Templates from older migration states are stale; drop them
+            stale = await conn.scalars(
+                text("SELECT datname FROM pg_database WHERE datname LIKE :prefix AND datname <> :name"),
+                {"prefix": f"{make_url(settings.TEST_DATABASE_URL).database}_tpl_%", "name": template_name},
+            )
+            for stale_name in stale.all():
+                await conn.execute(text(f'DROP DATABASE "{stale_name}"'))
+            await conn.execute(text(f'CREATE DATABASE "{template_name}" TEMPLATE "{engine.url.database}"'))
+        logger.info(f"[Test Setup] Cached migrated test DB as template '{template_name}'.")
+    except Exception as e:
+        # Caching is an optimisation only; a failure must not fail the session
+        logger.warning(f"[Test Setup] Could not cache test DB template '{template_name}': {e}")
+    finally:
+        await maintenance.dispose()
+
+async def _ensure_test_database(engine: AsyncEngine) -> None:
+    """Creates the engine's database if it does not exist yet (per-worker DBs under xdist)."""
+    maintenance = _maintenance_engine(engine)
+    try:
+        async with maintenance.connect() as conn:
+            exists = await conn.scalar(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": engine.url.database}
+            )
+            if not exists:
+                await conn.execute(text(f'CREATE DATABASE "{engine.url.database}"'))
+                logger.info(f"[Test Setup] Created worker test DB '{engine.url.database}'.")
+    finally:
+        await maintenance.dispose()
+
 # --- Database Fixtures ---
 
 @pytest.fixture(scope="session")
-def event_loop(request):
-    """Create an instance of the default event loop for each test session."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
-
-@pytest_asyncio.fixture(scope="function")
+def event_loop_policy() -> asyncio.AbstractEventLoopPolicy:
+    """Runs the test session on uvloop when it is installed, otherwise on the stdlib asyncio loop."""
+    try:
+        import uvloop # Installed with uvicorn[standard] (not available on Windows)
+    except ImportError:
+        return asyncio.DefaultEventLoopPolicy()
+    return uvloop.EventLoopPolicy()
+
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    """Runs every async test in the session loop that the session-scoped fixtures use.
+
+    pytest.ini sets asyncio_default_test_loop_scope for newer pytest-asyncio releases;
+    0.24 only honours the loop scope given on the asyncio marker.
+    """
+    session_scope_marker = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if pytest_asyncio.is_async_test(item):
+            item.add_marker(session_scope_marker, append=False)
+
+@pytest_asyncio.fixture(scope="session")
 async def engine() -> AsyncGenerator[AsyncEngine, None]:
-    """Creates an isolated async engine for each test with NullPool."""
+    """Creates the asyncpg-backed async engine and connection pool shared by the whole test session."""
     # Access the TEST_DATABASE_URL attribute directly
     test_db_dsn = settings.TEST_DATABASE_URL
     if not test_db_dsn:
         pytest.fail("TEST_DATABASE_URL could not be determined from settings. Ensure environment variables (e.g., TEST_POSTGRES_*) are set or TEST_DATABASE_URL is explicitly defined.")
 
-    # Convert the DSN object to a string for create_async_engine
-    test_db_url_str = str(test_db_dsn)
-
-    logger.info(f"[Test Setup] Creating engine for test with URL: {test_db_url_str}")
-    # Use NullPool to ensure no connections are carried over between tests
-    e = create_async_engine(test_db_url_str, poolclass=NullPool, echo=False)
+    # Convert the DSN object to a URL for create_async_engine
+    test_db_url = make_url(str(test_db_dsn))
+    if TEST_WORKER_ID != "master":
+        # Under pytest-xdist every worker gets its own database, e.g. virtualstack_test_gw0
+        test_db_url = test_db_url.set(database=f"{test_db_url.database}_{TEST_WORKER_ID}")
+
+    logger.info(f"[Test Setup] Creating session engine with URL: {test_db_url}")
+    # One pool for the session: its lifetime matches the session-scoped event loop, so
+    # connections (and asyncpg's prepared statement caches) are reused instead of reopened
+    e = create_async_engine(
+        test_db_url,
+        pool_size=TEST_DB_POOL_SIZE,
+        max_overflow=0,
+        echo=False,
+    )
+    if TEST_WORKER_ID != "master":
+        # Worker DBs are not provisioned by docker-compose; create on first use
+        await _ensure_test_database(e)
     try:
         yield e
     finally:
@@ -119,50 +260,64 @@ async def engine() -> AsyncGenerator[AsyncEngine, None]:
             await e.dispose()
             logger.info("[Test Teardown] Engine disposed.")
 
-@pytest_asyncio.fixture(scope="function")
+@pytest_asyncio.fixture(scope="session")
 async def create_test_schema(engine: AsyncEngine) -> AsyncGenerator[AsyncConnection, None]:
-    """Fixture to drop/recreate schema using raw SQL + Alembic commands in a thread."""
+    """Drops/recreates the schema once per session using raw SQL + Alembic commands in a thread.
+
+    Session scope lets module-scoped fixtures (e.g. shared API keys) keep their rows
+    alive across the tests that consume them instead of being wiped by a per-test migration.
+    """
     schema_name = "iam" # Assuming 'iam' is the primary schema managed by Alembic
     unique_id = id(create_test_schema)
     logger.info(f"[Test Setup - {unique_id}] Acquiring connection and setting up schema '{schema_name}'.")
     alembic_cfg = None # Initialize alembic_cfg
-    test_db_url_str = str(engine.url) # Get URL for env var
+    test_db_url_str = engine.url.render_as_string(hide_password=False) # Get URL for env var
+
+    # 0. Fast path: restore the already-migrated DB from the local template cache
+    restored = CACHE_TEST_DB and await _restore_test_db_from_template(engine)
 
     conn = await engine.connect()
 
     try:
-        # 1. Drop/Create schema within a transaction
-        async with conn.begin():
-             logger.info(f"[Test Setup - {unique_id}] Dropping schema '{schema_name}' if exists (cascade).")
-             await conn.execute(DropSchema(schema_name, if_exists=True, cascade=True))
-             logger.info(f"[Test Setup - {unique_id}] Creating schema '{schema_name}'.")
-             await conn.execute(CreateSchema(schema_name, if_not_exists=True))
-             logger.info(f"[Test Setup - {unique_id}] Schema drop/create transaction committed.")
-
-        # 2. Use Alembic commands via asyncio.to_thread
-        logger.info(f"[Test Setup - {unique_id}] Configuring Alembic for upgrade command.")
-        alembic_cfg = AlembicConfig("alembic.ini")
-        # Point Alembic at our test DB URL directly (override ini)
-        alembic_cfg.set_main_option("sqlalchemy.url", test_db_url_str)
-        script_location = os.path.join(PROJECT_ROOT, "alembic")
-        alembic_cfg.set_main_option("script_location", script_location)
-
-        logger.info(f"[Test Setup - {unique_id}] Setting VIRTUALSTACK_TEST_DB_URL for Alembic thread: {test_db_url_str}")
-        os.environ["VIRTUALSTACK_TEST_DB_URL"] = test_db_url_str # Set env var
-
-        logger.info(f"[Test Setup - {unique_id}] Running Alembic upgrade command in thread...")
-        try:
-            # Run the synchronous Alembic command in a separate thread
-            await asyncio.to_thread(alembic.command.upgrade, alembic_cfg, "head")
-            logger.info(f"[Test Setup - {unique_id}] Alembic upgrade command thread finished.")
-        except Exception as e:
-             logger.error(f"[Test Setup - {unique_id}] Alembic upgrade command failed: {e}", exc_info=True)
-             raise
-        finally:
-             # Ensure env var is unset even if upgrade fails
-             if "VIRTUALSTACK_TEST_DB_URL" in os.environ:
-                 logger.info(f"[Test Setup - {unique_id}] Unsetting VIRTUALSTACK_TEST_DB_URL.")
-                 del os.environ["VIRTUALSTACK_TEST_DB_URL"]
+        if not restored:
+            # 1. Drop/Create schema within a transaction
+            async with conn.begin():
+                 logger.info(f"[Test Setup - {unique_id}] Dropping schema '{schema_name}' if exists (cascade).")
+                 await conn.execute(DropSchema(schema_name, if_exists=True, cascade=True))
+                 logger.info(f"[Test Setup - {unique_id}] Creating schema '{schema_name}'.")
+                 await conn.execute(CreateSchema(schema_name, if_not_exists=True))
+                 logger.info(f"[Test Setup - {unique_id}] Schema drop/create transaction committed.")
+
+            # 2. Use Alembic commands via asyncio.to_thread
+            logger.info(f"[Test Setup - {unique_id}] Configuring Alembic for upgrade command.")
+            alembic_cfg = AlembicConfig("alembic.ini")
+            # Point Alembic at our test DB URL directly (override ini)
+            alembic_cfg.set_main_option("sqlalchemy.url", test_db_url_str)
+            script_location = os.path.join(PROJECT_ROOT, "alembic")
+            alembic_cfg.set_main_option("script_location", script_location)
+
+            logger.info(f"[Test Setup - {unique_id}] Setting VIRTUALSTACK_TEST_DB_URL for Alembic thread: {test_db_url_str}")
+            os.environ["VIRTUALSTACK_TEST_DB_URL"] = test_db_url_str # Set env var
+
+            logger.info(f"[Test Setup - {unique_id}] Running Alembic upgrade command in thread...")
+            try:
+                # Run the synchronous Alembic command in a separate thread
+                await asyncio.to_thread(alembic.command.upgrade, alembic_cfg, "head")
+                logger.info(f"[Test Setup - {unique_id}] Alembic upgrade command thread finished.")
+            except Exception as e:
+                 logger.error(f"[Test Setup - {unique_id}] Alembic upgrade command failed: {e}", exc_info=True)
+                 raise
+            finally:
+                 # Ensure env var is unset even if upgrade fails
+                 if "VIRTUALSTACK_TEST_DB_URL" in os.environ:
+                     logger.info(f"[Test Setup - {unique_id}] Unsetting VIRTUALSTACK_TEST_DB_URL.")
+                     del os.environ["VIRTUALSTACK_TEST_DB_URL"]
+
+            if CACHE_TEST_DB:
+                # Snapshot needs the test DB free of connections; reconnect afterwards
+                await conn.close()
+                await _snapshot_test_db_to_template(engine)
+                conn = await engine.connect()
 
         # 3. Verify table existence *after* Alembic command thread completes
         try:
@@ -200,22 +355,103 @@ async def create_test_schema(engine: AsyncEngine) -> AsyncGenerator[AsyncConnect
              logger.info(f"[Test Teardown - {unique_id}] Closing connection yielded by create_test_schema.")
              await conn.close()
 
-@pytest_asyncio.fixture(scope="function")
-async def db_session(create_test_schema: AsyncConnection) -> AsyncGenerator[AsyncSession, None]: # Changed return type hint
-    """Yields an AsyncSession backed by the connection from create_test_schema."""
+@pytest_asyncio.fixture(scope="session")
+async def seed_session(create_test_schema: AsyncConnection) -> AsyncGenerator[AsyncSession, None]:
+    """Yields the session-wide AsyncSession used for seeding; its commits are real and persist."""
     conn = create_test_schema # The yielded connection
     # Create a session bound to this connection
-    TestSession = sessionmaker(conn, class_=AsyncSession, expire_on_commit=False)
+    TestSession = async_sessionmaker(conn, expire_on_commit=False)
     async with TestSession() as session:
-         logger.info(f"[Test Setup - {id(session)}] Yielding DB Session based on connection {id(conn)}.")
+         logger.info(f"[Test Setup - {id(session)}] Yielding seed session based on connection {id(conn)}.")
          yield session
          # Session is automatically closed by async context manager
-    logger.info(f"[Test Teardown - {id(session)}] db_session finished.")
-
-@pytest_asyncio.fixture(scope="function")
-async def seed_data(db_session: AsyncSession): # Now depends on the AsyncSession
-    """Seeds initial data like the default tenant, superuser, and core permissions."""
-    # Dependency on create_test_schema is now implicit via db_session
+    logger.info(f"[Test Teardown - {id(session)}] seed_session finished.")
+
+# Stack of per-test sessions; the get_db override hands the innermost one to request handlers.
+active_db_sessions: list[AsyncSession] = []
+
+@pytest_asyncio.fixture(scope="function", autouse=True)
+async def db_session(
+    engine: AsyncEngine, seed_session: AsyncSession
+) -> AsyncGenerator[AsyncSession, None]:
+    """Wraps each test in an outer transaction that is rolled back on teardown.
+
+    The session joins the transaction with savepoints, so commits issued by tests or
+    endpoints only release a savepoint and every write is undone after the test.
+    """
+    # Release anything the seed session still holds open (e.g. a login's autobegun transaction)
+    if seed_session.in_transaction():
+        await seed_session.commit()
+
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        session = AsyncSession(bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint")
+        active_db_sessions.append(session)
+        try:
+            yield session
+        finally:
+            active_db_sessions.pop()
+            await session.close()
+            await trans.rollback()
+            logger.debug(f"[Test Teardown - {id(session)}] Per-test transaction rolled back.")
+
+@pytest.fixture
+def profile_test(request) -> Generator[None, None, None]:
+    """Writes a pyinstrument HTML profile of the test to ./prof/ when PROFILE=1.
+
+    ASGITransport runs the app in-process, so endpoint code (token generation, DB queries)
+    shows up in the same call stack as the test itself.
+    """
+    if not PROFILE_TESTS:
+        yield
+        return
+
+    from pyinstrument import Profiler # Dev-only dependency, imported only when profiling
+
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        PROFILE_OUTPUT_DIR.mkdir(exist_ok=True)
+        # Parametrized test names contain brackets etc.; keep the filename filesystem-safe
+        report_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in request.node.name)
+        report_path = PROFILE_OUTPUT_DIR / f"{report_name}.html"
+        report_path.write_text(profiler.output_html())
+        logger.info(f"[Test Profile] Wrote {report_path}")
+
+# Roles seed_data creates in the default tenant. user_service.create only needs the default role
+# to exist, so it grants nothing: the permission tests rely on user2 holding no permissions beyond
+# the roles they assign. Invitation and role-assignment tests invite to or assign the tenant admin role.
+SEEDED_TENANT_ROLES = {
+    DEFAULT_ROLE_NAME: set(),
+    TENANT_ADMIN_ROLE_NAME: core_permissions.ROLE_PERMISSIONS["tenant_admin"],
+}
+
+async def _ensure_tenant_role(
+    session: AsyncSession, tenant_id: UUID, name: str, permissions: set[core_permissions.Permission]
+) -> Role:
+    """Returns the tenant's role with this name, creating it and granting its permissions if missing."""
+    role = await session.scalar(select(Role).where(Role.tenant_id == tenant_id, Role.name == name))
+    if role:
+        return role
+    role = Role(name=name, description=f"{name} seeded for tests", tenant_id=tenant_id)
+    session.add(role)
+    await session.flush() # Assigns the role ID for the grants below
+    # Permission rows are seeded by the migrations; grant them in one executemany insert
+    permission_ids = await session.scalars(
+        select(Permission.id).where(Permission.code.in_([p.value for p in permissions]))
+    )
+    grants = [{"role_id": role.id, "permission_id": permission_id} for permission_id in permission_ids]
+    if grants:
+        await session.execute(role_permissions_table.insert(), grants)
+    return role
+
+@pytest_asyncio.fixture(scope="session")
+async def seed_data(seed_session: AsyncSession):
+    """Seeds initial data: the default tenant with its roles, the superuser and user2."""
+    # Seeded rows are committed so that every per-test transaction can see them
     from src.virtualstack.services.iam.tenant import tenant_service
     from src.virtualstack.services.iam.user import user_service
     from src.virtualstack.schemas.iam.tenant import TenantCreate
@@ -227,17 +463,31 @@ async def seed_data(db_session: AsyncSession): # Now depends on the AsyncSession
 
     try:
         # Ensure default tenant exists - Use the new specific setting
-        tenant = await tenant_service.get_by_name(db_session, name=settings.DEFAULT_TEST_TENANT_NAME)
+        tenant = await tenant_service.get_by_name(seed_session, name=settings.DEFAULT_TEST_TENANT_NAME)
         if not tenant:
             logger.info(f"[Test Setup - {unique_id}] Default test tenant '{settings.DEFAULT_TEST_TENANT_NAME}' not found, creating.")
             tenant_in = TenantCreate(name=settings.DEFAULT_TEST_TENANT_NAME)
-            tenant = await tenant_service.create(db_session, obj_in=tenant_in)
+            tenant = await tenant_service.create(seed_session, obj_in=tenant_in)
             logger.info(f"[Test Setup - {unique_id}] Default test tenant created with ID: {tenant.id}.")
         else:
             logger.info(f"[Test Setup - {unique_id}] Default test tenant '{settings.DEFAULT_TEST_TENANT_NAME}' already exists with ID: {tenant.id}.")
 
+        # Ensure the tenant's roles exist before any user is created (user creation needs the default role)
+        seeded_roles = {
+            name: await _ensure_tenant_role(seed_session, tenant.id, name, permissions)
+            for name, permissions in SEEDED_TENANT_ROLES.items()
+        }
+        tenant_admin_role = seeded_roles[TENANT_ADMIN_ROLE_NAME]
+        logger.info(f"[Test Setup - {unique_id}] Tenant roles ready: {', '.join(seeded_roles)}.")
+
+        # Look up both seeded users in one round-trip. The lookups are independent, but they
+        # share seed_session and an AsyncSession cannot run queries concurrently (no gather).
+        seeded_emails = [settings.SUPERUSER_EMAIL, TEST_USER2_EMAIL]
+        result = await seed_session.execute(select(User).where(User.email.in_(seeded_emails)))
+        existing_users = {user.email: user for user in result.scalars()}
+
         # Ensure superuser exists
-        superuser = await user_service.get_by_email(db_session, email=settings.SUPERUSER_EMAIL)
+        superuser = existing_users.get(settings.SUPERUSER_EMAIL)
         if not superuser:
             logger.info(f"[Test Setup - {unique_id}] Superuser '{settings.SUPERUSER_EMAIL}' not found, creating.")
             user_in = UserCreate(
@@ -248,54 +498,102 @@ async def seed_data(db_session: AsyncSession): # Now depends on the AsyncSession
                 is_superuser=True # Explicitly set
             )
             # Update to use create instead of create_user and match parameter names
-            superuser = await user_service.create(db_session, obj_in=user_in, tenant_id=tenant.id)
+            superuser = await user_service.create(seed_session, obj_in=user_in, tenant_id=tenant.id)
             logger.info(f"[Test Setup - {unique_id}] Superuser created with ID: {superuser.id}.")
         else:
             logger.info(f"[Test Setup - {unique_id}] Superuser '{settings.SUPERUSER_EMAIL}' already exists with ID: {superuser.id}.")
 
+        # Ensure the regular (non-superuser) second test user exists
+        user2 = existing_users.get(TEST_USER2_EMAIL)
+        if not user2:
+            logger.info(f"[Test Setup - {unique_id}] Test user2 '{TEST_USER2_EMAIL}' not found, creating.")
+            user2_in = UserCreate(
+                email=TEST_USER2_EMAIL,
+                password=TEST_USER2_PASSWORD,
+                first_name="Test",
+                last_name="User2",
+            )
+            user2 = await user_service.create(seed_session, obj_in=user2_in, tenant_id=tenant.id)
+            logger.info(f"[Test Setup - {unique_id}] Test user2 created with ID: {user2.id}.")
+
+        await seed_session.commit()
         logger.info(f"[Test Setup - {unique_id}] Data seeding completed successfully.")
-        return {"tenant": tenant, "superuser": superuser} # Return seeded objects if needed
+        return { # Return seeded objects if needed
+            "tenant": tenant,
+            "superuser": superuser,
+            "user2": user2,
+            "tenant_admin_role": tenant_admin_role,
+        }
 
     except Exception as e:
         logger.error(f"[Test Setup - {unique_id}] Error during data seeding: {e}", exc_info=True)
         raise
 
+@pytest_asyncio.fixture(scope="session")
+async def seeded_perms(seed_session: AsyncSession) -> dict[str, UUID]:
+    """Maps each permission code seeded by the migrations (e.g. "vm:read") to its ID; read once per session."""
+    result = await seed_session.execute(select(Permission.code, Permission.id))
+    return dict(result.all())
+
 # --- Application Fixtures ---
 
-@pytest.fixture(scope="function")
-def app(db_session: AsyncSession) -> FastAPI: # Depends on AsyncSession
+@pytest.fixture(scope="session")
+def app(seed_session: AsyncSession) -> FastAPI: # Depends on AsyncSession
     """Overrides dependencies for the FastAPI app for testing, depends on schema being ready."""
     # Create a no-op rate limiter for tests
     async def fake_rate_limiter():
         """No-op rate limiter for testing."""
         return None
 
-    # Override get_db to use the single connection provided by db_session fixture
+    # Override get_db to use the current test's rolled-back session (see db_session).
+    # Session-scoped fixtures that make requests outside a test fall back to seed_session.
+    # Every request in a test shares that one AsyncSession, which must not be used concurrently,
+    # so tests issue their requests sequentially. The lock only protects the shared session:
+    # it is held for a whole request, so overlapping requests would run one after another,
+    # never concurrently. Don't asyncio.gather requests expecting them to overlap.
+    db_session_lock = asyncio.Lock()
+
     async def override_get_db() -> AsyncGenerator[AsyncSession, None]: # Yield AsyncSession
-         logger.debug(f"[Dependency Override] Yielding session {id(db_session)} for get_db")
-         yield db_session
-         # Session lifecycle managed by db_session fixture
+         async with db_session_lock:
+             session = active_db_sessions[-1] if active_db_sessions else seed_session
+             logger.debug(f"[Dependency Override] Yielding session {id(session)} for get_db")
+             yield session
+         # Session lifecycle managed by the db_session / seed_session fixtures
 
     # More explicit dependency override setup
     fastapi_app.dependency_overrides[login_rate_limiter] = fake_rate_limiter
     fastapi_app.dependency_overrides[get_db] = override_get_db # Use the session override
-    logger.info(f"[Test Setup] FastAPI app configured with overridden dependencies (rate_limiter, get_db using session {id(db_session)}).")
+    logger.info(f"[Test Setup] FastAPI app configured with overridden dependencies (rate_limiter, get_db using per-test sessions).")
 
     yield fastapi_app
 
-    # Clean up overrides after test
+    # Clean up overrides at the end of the session
     fastapi_app.dependency_overrides = {}
     logger.info("[Test Teardown] FastAPI dependency overrides cleared.")
 
-@pytest_asyncio.fixture(scope="function")
-async def client(app: FastAPI) -> AsyncGenerator[AsyncClient, None]:
-    """Provides an AsyncClient for making requests to the test app."""
-    # Use ASGITransport directly for FastAPI lifespan events
-    transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url="http://test") as c:
-        logger.info("[Test Setup] AsyncClient created.")
+@pytest.fixture(scope="session")
+def asgi_transport(app: FastAPI) -> ASGITransport:
+    """The one in-process transport shared by every test client for the whole session.
+
+    ASGITransport keeps no sockets, so there is no connection pool to size (httpx.Limits) or
+    network timeout to tune; sharing it just keeps a single transport for all clients.
+    """
+    return ASGITransport(app=app)
+
+def _build_async_client(transport: ASGITransport) -> AsyncClient:
+    """Builds an AsyncClient bound in-process to the FastAPI app via ASGITransport.
+
+    Requests are plain ASGI calls into the app: no server, socket or TCP loopback is involved.
+    """
+    return AsyncClient(transport=transport, base_url="http://test")
+
+@pytest_asyncio.fixture(scope="session")
+async def async_client(asgi_transport: ASGITransport) -> AsyncGenerator[AsyncClient, None]:
+    """Provides the shared, unauthenticated AsyncClient reused by every test in the session."""
+    async with _build_async_client(asgi_transport) as c:
+        logger.info("[Test Setup] Shared AsyncClient created.")
         yield c
-    logger.info("[Test Teardown] AsyncClient closed.")
+    logger.info("[Test Teardown] Shared AsyncClient closed.")
 
 # --- Authentication Fixtures ---
 
@@ -304,67 +602,74 @@ async def client(app: FastAPI) -> AsyncGenerator[AsyncClient, None]:
 
 # --- Authentication Helpers ---
 
-# Remove _get_token and get_user_token helpers
-# async def _get_token(...)
-# async def get_user_token(...)
+async def _login(client: AsyncClient, email: str, password: str) -> str:
+    """Logs in through the OAuth2 token endpoint and returns the bearer access token."""
+    token_url = "/api/v1/auth/token"
+    response = None
+    try:
+        # httpx sets the form Content-Type itself for data=; no per-call headers needed
+        response = await client.post(token_url, data={"username": email, "password": password})
+        response.raise_for_status()
+        return response.json()["access_token"]
+    except Exception as e:
+        logger.error(f"[Test Setup] Failed to log in as {email}: {e}", exc_info=True)
+        if response is not None:
+             logger.error(f"Login response status: {response.status_code}")
+             try:
+                 logger.error(f"Login response body: {response.json()}")
+             except Exception:
+                 logger.error(f"Login response body (non-JSON): {response.text}")
+        pytest.fail(f"Failed to log in as {email}: {e}")
+
+# Tokens are minted once per session: every login pays a bcrypt verification on the server.
+@pytest_asyncio.fixture(scope="session")
+async def superuser_token(async_client: AsyncClient, seed_data: dict) -> str:
+    """Logs the seeded superuser in once and caches the bearer token for the session."""
+    logger.info("[Test Setup] Getting session token for the superuser...")
+    return await _login(async_client, settings.SUPERUSER_EMAIL, settings.SUPERUSER_PASSWORD)
+
+@pytest_asyncio.fixture(scope="session")
+async def user2_token(async_client: AsyncClient, seed_data: dict) -> str:
+    """Logs the seeded second (regular) user in once and caches the bearer token for the session."""
+    logger.info("[Test Setup] Getting session token for user2...")
+    return await _login(async_client, TEST_USER2_EMAIL, TEST_USER2_PASSWORD)
 
 # --- Authenticated Clients ---
 
-# Update authenticated clients to use tokens from seed_data
-@pytest_asyncio.fixture(scope="function")
-async def authenticated_async_client(client: AsyncClient, seed_data: dict) -> AsyncClient:
+# Each authenticated client is its own long-lived AsyncClient so default headers never leak
+# between identities (or into the unauthenticated async_client).
+@pytest_asyncio.fixture(scope="session")
+async def authenticated_async_client(
+    asgi_transport: ASGITransport, seed_data: dict, superuser_token: str
+) -> AsyncGenerator[AsyncClient, None]:
     """Provides an authenticated async client (using the seeded superuser's token)."""
     superuser = seed_data.get("superuser")
     tenant = seed_data.get("tenant")
     if not superuser or not tenant:
         pytest.fail("Seeding failed to provide superuser or tenant objects.")
 
-    logger.info("[Test Setup] Getting token for authenticated_async_client (superuser)...")
-    login_data = {
-        "username": settings.SUPERUSER_EMAIL,
-        "password": settings.SUPERUSER_PASSWORD,
-    }
-    token_url = "/api/v1/auth/token"
-    response = None
-    try:
-        response = await client.post(
-            token_url,
-            data=login_data,
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-        )
-        response.raise_for_status()
-        token_data = response.json()
-        access_token = token_data["access_token"]
-        
-        # Set headers on the client instance
-        client.headers["Authorization"] = f"Bearer {access_token}"
+    async with _build_async_client(asgi_transport) as client:
+        client.headers["Authorization"] = f"Bearer {superuser_token}"
         # Set tenant header for superuser tests, using the seeded tenant ID
         client.headers["X-Tenant-ID"] = str(tenant.id)
         logger.info(f"[Test Setup] authenticated_async_client ready (Superuser, Tenant: {tenant.id}).")
-        return client # Return the configured client
-    except Exception as e:
-        logger.error(f"[Test Setup] Failed to authenticate client: {e}", exc_info=True)
-        if response is not None:
-             logger.error(f"Login response status: {response.status_code}")
-             try:
-                 logger.error(f"Login response body: {response.json()}")
-             except Exception:
-                 logger.error(f"Login response body (non-JSON): {response.text}")
-        pytest.fail(f"Failed to authenticate client: {e}")
+        yield client
 
-@pytest_asyncio.fixture(scope="function")
-async def authenticated_async_client_user2(async_client: AsyncClient, seed_data: dict) -> AsyncClient:
-    """Provides an authenticated async client (using the second test user's token from seed_data)."""
-    token = seed_data["test_user_token"]
+@pytest_asyncio.fixture(scope="session")
+async def authenticated_async_client_user2(
+    asgi_transport: ASGITransport, seed_data: dict, user2_token: str
+) -> AsyncGenerator[AsyncClient, None]:
+    """Provides an authenticated async client (using the second test user's session token)."""
     tenant = seed_data["tenant"]
-    async_client.headers["Authorization"] = f"Bearer {token}"
-    async_client.headers["X-Tenant-ID"] = str(tenant.id)
-    logging.info(f"Authenticated client created for test user 2 using seeded token.")
-    return async_client
+    async with _build_async_client(asgi_transport) as client:
+        client.headers["Authorization"] = f"Bearer {user2_token}"
+        client.headers["X-Tenant-ID"] = str(tenant.id)
+        logger.info(f"[Test Setup] authenticated_async_client_user2 ready (Tenant: {tenant.id}).")
+        yield client
 
 # --- Specific Test Dependencies ---
 # Keep setup_invitation_dependencies for now, but it might need review later
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
 def setup_invitation_dependencies(seed_data: dict) -> dict:
     """Provides necessary dependencies (tenant_id, role_id) for invitation tests."""
     tenant = seed_data["tenant"]
@@ -374,6 +679,35 @@ def setup_invitation_dependencies(seed_data: dict) -> dict:
         "role_id": tenant_admin_role.id
     }
 
+# Invitation fixtures are shared by test_invitations_readonly.py and test_invitations_mutations.py,
+# which import these endpoint paths too; per-invitation paths append the ID to INVITATIONS_URL
+INVITATIONS_URL = "/api/v1/invitations/"
+INVITATION_VERIFY_URL = f"{INVITATIONS_URL}verify"
+INVITATION_ACCEPT_URL = f"{INVITATIONS_URL}accept"
+
+async def _create_invitation(client: AsyncClient, dependencies: dict, email_prefix: str) -> dict:
+    """Creates a pending invitation over the API and returns its id, token and email."""
+    email = f"{email_prefix}-{uuid4()}@example.com"
+    invitation_data = {
+        "email": email,
+        "tenant_id": str(dependencies["tenant_id"]),
+        "role_id": str(dependencies["role_id"]),
+    }
+    response = await client.post(INVITATIONS_URL, json=invitation_data)
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    data = response.json()
+    return {"id": data["id"], "token": data["token"], "email": email}
+
+@pytest_asyncio.fixture(scope="session")
+async def created_invitation(authenticated_async_client: AsyncClient, setup_invitation_dependencies: dict) -> dict:
+    """Creates one pending invitation per session (per xdist worker), shared by the read-only tests."""
+    return await _create_invitation(authenticated_async_client, setup_invitation_dependencies, "shared-invitee")
+
+@pytest_asyncio.fixture(scope="function")
+async def fresh_invitation(authenticated_async_client: AsyncClient, setup_invitation_dependencies: dict) -> dict:
+    """Creates a new pending invitation for a test that changes its state (revoke, accept)."""
+    return await _create_invitation(authenticated_async_client, setup_invitation_dependencies, "fresh-invitee")
+
 # Remove old Test Clients fixtures (admin_client, test_user_client)
 # They are effectively replaced by authenticated_async_client and authenticated_async_client_user2
 # @pytest_asyncio.fixture(scope="function")
@@ -381,41 +715,13 @@ def setup_invitation_dependencies(seed_data: dict) -> dict:
 # @pytest_asyncio.fixture(scope="function")
 # async def test_user_client(...)
 
-# Fixture to get authentication token for the superuser
-@pytest_asyncio.fixture(scope="function")
-async def superuser_token_headers(client: AsyncClient, seed_data: dict) -> dict[str, str]:
-    """Generates authentication token headers for the seeded superuser by logging in."""
-    logger.info("[Test Setup] Getting token for superuser_token_headers...")
-    login_data = {
-        "username": settings.SUPERUSER_EMAIL,
-        "password": settings.SUPERUSER_PASSWORD,
+# Fixture to get authentication headers for the superuser (built once; the token is session-wide)
+@pytest.fixture(scope="session")
+def superuser_token_headers(superuser_token: str, seed_data: dict) -> dict[str, str]:
+    """Builds authentication headers for the seeded superuser from the cached session token."""
+    headers = {
+        "Authorization": f"Bearer {superuser_token}",
+        "X-Tenant-ID": str(seed_data["tenant"].id)
     }
-    token_url = "/api/v1/auth/token"
-    response = None
-    try:
-        # Use the *base* client fixture which doesn't have preset headers
-        async with AsyncClient(transport=ASGITransport(app=fastapi_app), base_url="http://test") as temp_client:
-            response = await temp_client.post(
-                token_url,
-                data=login_data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
-            response.raise_for_status()
-            token_data = response.json()
-            access_token = token_data["access_token"]
-
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "X-Tenant-ID": str(seed_data["tenant"].id)
-            }
-            logger.info(f"[Test Setup] superuser_token_headers generated (Tenant: {seed_data['tenant'].id}).")
-            return headers
-    except Exception as e:
-        logger.error(f"[Test Setup] Failed to get token for superuser_token_headers: {e}", exc_info=True)
-        if response is not None:
-             logger.error(f"Login response status: {response.status_code}")
-             try:
-                 logger.error(f"Login response body: {response.json()}")
-             except Exception:
-                 logger.error(f"Login response body (non-JSON): {response.text}")
-        pytest.fail(f"Failed to get token for superuser_token_headers: {e}")
+    logger.info(f"[Test Setup] superuser_token_headers generated (Tenant: {seed_data['tenant'].id}).")
+    return headers
@@ -1,81 +1,95 @@
-from uuid import uuid4
+from datetime import datetime, timedelta, timezone
+import logging
+from uuid import UUID, uuid4
 
 from fastapi import status
 from httpx import AsyncClient
 import pytest
 import pytest_asyncio # Added for fixture decorator
+from sqlalchemy import delete, update
 from sqlalchemy.ext.asyncio import AsyncSession # Added for type hint
 
-from virtualstack.schemas.iam.api_key import APIKeyScope
-from virtualstack.models.iam import User
+from virtualstack.core.config import settings
+from virtualstack.schemas.iam.api_key import APIKeyCreate, APIKeyScope
+from virtualstack.models.iam import APIKey, User
+from virtualstack.services.iam import api_key_service
+
+logger = logging.getLogger(__name__)
 
 # Define the header name used for API key authentication
 API_KEY_NAME = "X-API-Key" # TODO: Confirm this matches the actual implementation in deps.py
 
 
-# Test data
-TEST_API_KEY_BASE_NAME = f"pytest-key-{uuid4()}"
+# Test data (names get a unique suffix when the fixture runs, not at import/collection)
 TEST_API_KEY_SUPERUSER = {
-    "name": f"{TEST_API_KEY_BASE_NAME}-su",
+    "name_suffix": "su",
     "description": "API Key created via pytest fixture (superuser)",
     "scope": APIKeyScope.GLOBAL.value,
 }
 TEST_API_KEY_USER2 = {
-    "name": f"{TEST_API_KEY_BASE_NAME}-user2",
+    "name_suffix": "user2",
     "description": "API Key created via pytest fixture (user2)",
     "scope": APIKeyScope.GLOBAL.value,
 }
 
-# Mark tests as asyncio
-pytestmark = pytest.mark.asyncio
-
 # --- Fixtures ---
 
-@pytest_asyncio.fixture(scope="function")
-async def superuser_api_key(authenticated_async_client: AsyncClient) -> dict:
-    """Fixture to create an API key as superuser and clean it up."""
-    created_key_data = None
-    key_id_to_delete = None
-    print("\nCreating API key via superuser_api_key fixture...")
-    try:
-        response = await authenticated_async_client.post("/api/v1/api-keys/", json=TEST_API_KEY_SUPERUSER)
-        response.raise_for_status()
-        created_key_data = response.json()
-        key_id_to_delete = created_key_data.get("id")
-        print(f"Fixture created superuser API key ID: {key_id_to_delete}")
-        yield created_key_data # Yield the full data including the raw key
-    finally:
-        if key_id_to_delete:
-            print(f"Cleaning up superuser API key ID: {key_id_to_delete}")
-            delete_response = await authenticated_async_client.delete(f"/api/v1/api-keys/{key_id_to_delete}")
-            if delete_response.status_code not in [status.HTTP_204_NO_CONTENT, status.HTTP_404_NOT_FOUND]:
-                print(f"WARNING: Failed to cleanup superuser API key {key_id_to_delete}. Status: {delete_response.status_code}, Text: {delete_response.text}")
-        else:
-             print("No superuser API key ID found to clean up in fixture.")
-
-
-@pytest_asyncio.fixture(scope="function")
-async def user2_api_key(authenticated_async_client_user2: AsyncClient) -> dict:
-    """Fixture to create an API key as user2 and clean it up."""
-    created_key_data = None
-    key_id_to_delete = None
-    print("\nCreating API key via user2_api_key fixture...")
-    try:
-        response = await authenticated_async_client_user2.post("/api/v1/api-keys/", json=TEST_API_KEY_USER2)
-        response.raise_for_status()
-        created_key_data = response.json()
-        key_id_to_delete = created_key_data.get("id")
-        print(f"Fixture created user2 API key ID: {key_id_to_delete}")
-        yield created_key_data
-    finally:
-        if key_id_to_delete:
-            print(f"Cleaning up user2 API key ID: {key_id_to_delete}")
-            # Use the same client that created it to delete it
-            delete_response = await authenticated_async_client_user2.delete(f"/api/v1/api-keys/{key_id_to_delete}")
-            if delete_response.status_code not in [status.HTTP_204_NO_CONTENT, status.HTTP_404_NOT_FOUND]:
-                print(f"WARNING: Failed to cleanup user2 API key {key_id_to_delete}. Status: {delete_response.status_code}, Text: {delete_response.text}")
-        else:
-             print("No user2 API key ID found to clean up in fixture.")
+@pytest_asyncio.fixture(scope="module")
+async def provisioned_api_keys(seed_session: AsyncSession, seed_data: dict) -> dict:
+    """Fixture to insert the module's shared API keys directly via the service layer.
+
+    Both keys are committed in a single transaction (no HTTP round-trips) so every
+    test's rolled-back transaction can see them, and removed together at module teardown.
+    """
+    base_name = f"pytest-key-{uuid4()}"
+    owners = {
+        "superuser": (seed_data["superuser"], TEST_API_KEY_SUPERUSER),
+        "user2": (seed_data["user2"], TEST_API_KEY_USER2),
+    }
+    built = {
+        label: api_key_service.build_with_user(
+            obj_in=APIKeyCreate(
+                name=f"{base_name}-{key_data['name_suffix']}",
+                description=key_data["description"],
+                scope=key_data["scope"],
+            ),
+            user_id=owner.id,
+        )
+        for label, (owner, key_data) in owners.items()
+    }
+    seed_session.add_all([db_obj for db_obj, _ in built.values()])
+    await seed_session.commit()
+    logger.debug("Provisioned API keys for superuser and user2 via the service layer.")
+
+    # Shape the fixture data like the POST /api-keys/ response (including the raw key)
+    yield {
+        label: {
+            "id": str(db_obj.id),
+            "name": db_obj.name,
+            "description": db_obj.description,
+            "scope": db_obj.scope.value,
+            "key": raw_key,
+        }
+        for label, (db_obj, raw_key) in built.items()
+    }
+
+    await seed_session.execute(
+        delete(APIKey).where(APIKey.id.in_([db_obj.id for db_obj, _ in built.values()]))
+    )
+    await seed_session.commit()
+    logger.debug("Cleaned up provisioned API keys.")
+
+
+@pytest.fixture(scope="module")
+def superuser_api_key(provisioned_api_keys: dict) -> dict:
+    """Fixture providing the module-shared API key owned by the superuser."""
+    return provisioned_api_keys["superuser"]
+
+
+@pytest.fixture(scope="module")
+def user2_api_key(provisioned_api_keys: dict) -> dict:
+    """Fixture providing the module-shared API key owned by user2."""
+    return provisioned_api_keys["user2"]
 
 
 # --- Superuser Tests ---
@@ -84,7 +98,7 @@ async def user2_api_key(authenticated_async_client_user2: AsyncClient) -> dict:
 
 async def test_create_api_key(authenticated_async_client: AsyncClient):
     """Test creating a new API key (superuser)."""
-    # This test creates its own key and should clean it up
+    # This test creates its own key; the per-test transaction rollback removes it
     key_data = {
         "name": f"test-create-key-{uuid4()}",
         "description": "API Key created directly in test_create_api_key",
@@ -102,12 +116,6 @@ async def test_create_api_key(authenticated_async_client: AsyncClient):
     assert len(data["key"]) > 10
     assert data["key"].startswith("vsak_") # Updated prefix check
 
-    # Cleanup the key created by this test
-    key_id_to_delete = data["id"]
-    print(f"Cleaning up key from test_create_api_key: {key_id_to_delete}")
-    delete_response = await authenticated_async_client.delete(f"/api/v1/api-keys/{key_id_to_delete}")
-    assert delete_response.status_code == status.HTTP_204_NO_CONTENT, f"Cleanup failed: {delete_response.text}"
-
 
 async def test_get_api_keys(authenticated_async_client: AsyncClient, superuser_api_key: dict):
     """Test retrieving API keys (should retrieve the one created by fixture)."""
@@ -147,6 +155,7 @@ async def test_update_api_key(authenticated_async_client: AsyncClient, superuser
     assert data["id"] == api_key_id
     assert data["description"] == update_data["description"]
     assert data["name"] == superuser_api_key["name"] # Name shouldn't change
+    # The shared key's description is restored by the per-test transaction rollback
 
 
 async def test_delete_api_key(authenticated_async_client: AsyncClient):
@@ -170,82 +179,40 @@ async def test_delete_api_key(authenticated_async_client: AsyncClient):
     assert response_get.status_code == status.HTTP_404_NOT_FOUND
 
 
-@pytest.mark.asyncio
-async def test_get_api_key_not_found(authenticated_async_client: AsyncClient):
-    """Test getting a non-existent API key by ID."""
-    non_existent_uuid = uuid4()
-    response = await authenticated_async_client.get(f"/api/v1/api-keys/{non_existent_uuid}")
-    assert response.status_code == status.HTTP_404_NOT_FOUND
-    assert "not found" in response.json()["detail"].lower()
-
-
-@pytest.mark.asyncio
-async def test_update_api_key_not_found(authenticated_async_client: AsyncClient):
-    """Test updating a non-existent API key."""
+@pytest.mark.parametrize("method", ["GET", "PUT", "DELETE"])
+async def test_api_key_not_found(authenticated_async_client: AsyncClient, method: str):
+    """Test getting, updating and deleting a non-existent API key."""
     non_existent_uuid = uuid4()
     update_data = {"description": "Updated Non-existent Key"}
-    response = await authenticated_async_client.put(
-        f"/api/v1/api-keys/{non_existent_uuid}", json=update_data
+    response = await authenticated_async_client.request(
+        method,
+        f"/api/v1/api-keys/{non_existent_uuid}",
+        json=update_data if method == "PUT" else None,
     )
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert "not found" in response.json()["detail"].lower()
 
 
-@pytest.mark.asyncio
-async def test_delete_api_key_not_found(authenticated_async_client: AsyncClient):
-    """Test deleting a non-existent API key."""
-    non_existent_uuid = uuid4()
-    response = await authenticated_async_client.delete(f"/api/v1/api-keys/{non_existent_uuid}")
-    assert response.status_code == status.HTTP_404_NOT_FOUND
-    assert "not found" in response.json()["detail"].lower()
-
-
-@pytest.mark.asyncio
-async def test_get_api_key_forbidden(
+@pytest.mark.parametrize("method", ["GET", "PUT", "DELETE"])
+async def test_api_key_forbidden(
     authenticated_async_client_user2: AsyncClient,
-    superuser_api_key: dict # Create superuser's key
+    superuser_api_key: dict, # Superuser's key
+    method: str,
 ):
-    """Test getting another user's (superuser's) API key (as non-superuser) - should fail 403."""
-    api_key_id = superuser_api_key["id"] # Get superuser's key ID from fixture
-
-    response = await authenticated_async_client_user2.get(f"/api/v1/api-keys/{api_key_id}")
-    # Expect 403 Forbidden, not 404, as the key exists but user2 shouldn't access it
-    assert response.status_code == status.HTTP_403_FORBIDDEN, response.text
-    assert "permission" in response.json()["detail"].lower()
-
-
-@pytest.mark.asyncio
-async def test_update_api_key_forbidden(
-    authenticated_async_client_user2: AsyncClient,
-    superuser_api_key: dict # Create superuser's key
-):
-    """Test updating another user's (superuser's) API key (as non-superuser) - should fail 403."""
+    """Test getting, updating and deleting another user's (superuser's) API key (as non-superuser) - should fail 403."""
     api_key_id = superuser_api_key["id"] # Get superuser's key ID from fixture
     update_data = {"description": "Attempted Update by User 2"}
 
-    response = await authenticated_async_client_user2.put(
-        f"/api/v1/api-keys/{api_key_id}", json=update_data
+    response = await authenticated_async_client_user2.request(
+        method,
+        f"/api/v1/api-keys/{api_key_id}",
+        json=update_data if method == "PUT" else None,
     )
-    # Expect 403 Forbidden
-    assert response.status_code == status.HTTP_403_FORBIDDEN, response.text
-    assert "permission" in response.json()["detail"].lower()
-
-
-@pytest.mark.asyncio
-async def test_delete_api_key_forbidden(
-    authenticated_async_client_user2: AsyncClient,
-    superuser_api_key: dict # Create superuser's key
-):
-    """Test deleting another user's (superuser's) API key (as non-superuser) - should fail 403."""
-    api_key_id = superuser_api_key["id"] # Get superuser's key ID from fixture
-
-    response = await authenticated_async_client_user2.delete(f"/api/v1/api-keys/{api_key_id}")
-    # Expect 403 Forbidden
+    # Expect 403 Forbidden, not 404, as the key exists but user2 shouldn't access it
     assert response.status_code == status.HTTP_403_FORBIDDEN, response.text
     assert "permission" in response.json()["detail"].lower()
 
 
-@pytest.mark.asyncio
 async def test_create_api_key_invalid_data(authenticated_async_client: AsyncClient):
     """Test creating an API key with missing required data (name)."""
     invalid_data = {"description": "Key without name"}
@@ -256,11 +223,10 @@ async def test_create_api_key_invalid_data(authenticated_async_client: AsyncClie
 
 # user2_key_data defined globally is now TEST_API_KEY_USER2
 
-@pytest.mark.asyncio
 async def test_user2_create_api_key(
-    authenticated_async_client_user2: AsyncClient
+    authenticated_async_client_user2: AsyncClient,
 ) -> None:
-    """Test user2 creating their own API key (creates and cleans up)."""
+    """Test user2 creating their own API key (rolled back after the test)."""
     key_data = { # Use local data specific to this test run
         "name": f"test-user2-create-{uuid4()}",
         "description": "API Key created directly in user2 create test",
@@ -270,25 +236,14 @@ async def test_user2_create_api_key(
     assert response.status_code == status.HTTP_201_CREATED, response.text
     data = response.json()
     assert data["name"] == key_data["name"]
-    # Store user2's key ID for subsequent tests # REMOVED - No longer needed
-    # pytest.user2_api_key_id = data["id"] # REMOVED
-    # pytest.user2_api_key_value = data["key"] # REMOVED
-
-    # Cleanup
-    key_id_to_delete = data["id"]
-    print(f"Cleaning up key from test_user2_create_api_key: {key_id_to_delete}")
-    delete_response = await authenticated_async_client_user2.delete(f"/api/v1/api-keys/{key_id_to_delete}")
-    assert delete_response.status_code == status.HTTP_204_NO_CONTENT, f"Cleanup failed: {delete_response.text}"
 
 
-@pytest.mark.asyncio
 async def test_user2_list_own_api_keys(
     authenticated_async_client_user2: AsyncClient,
     user2_api_key: dict, # Use the user2 fixture
     superuser_api_key: dict # Also create the superuser key to ensure it's not listed
 ) -> None:
     """Test user2 listing their own API keys."""
-    # assert hasattr(pytest, "user2_api_key_id"), "User2 API Key ID not set" # REMOVED
     user2_key_id = user2_api_key["id"]
     superuser_key_id = superuser_api_key["id"]
 
@@ -300,17 +255,14 @@ async def test_user2_list_own_api_keys(
     found_user2_key = any(item["id"] == user2_key_id for item in data)
     assert found_user2_key, "User2's fixture key not found in their list"
     # Check that the superuser's key is NOT present
-    # if hasattr(pytest, "api_key_id"): # REMOVED
     found_superuser_key = any(item["id"] == superuser_key_id for item in data)
     assert not found_superuser_key, "Superuser's key found in user2's list"
 
-@pytest.mark.asyncio
 async def test_user2_get_own_api_key(
     authenticated_async_client_user2: AsyncClient,
     user2_api_key: dict # Use the user2 fixture
 ) -> None:
     """Test user2 getting their own API key by ID."""
-    # assert hasattr(pytest, "user2_api_key_id"), "User2 API Key ID not set" # REMOVED
     key_id = user2_api_key["id"]
     response = await authenticated_async_client_user2.get(f"/api/v1/api-keys/{key_id}")
     assert response.status_code == status.HTTP_200_OK, response.text
@@ -318,13 +270,11 @@ async def test_user2_get_own_api_key(
     assert data["id"] == key_id
     assert data["name"] == user2_api_key["name"]
 
-@pytest.mark.asyncio
 async def test_user2_update_own_api_key(
     authenticated_async_client_user2: AsyncClient,
     user2_api_key: dict # Use the user2 fixture
 ) -> None:
     """Test user2 updating their own API key."""
-    # assert hasattr(pytest, "user2_api_key_id"), "User2 API Key ID not set" # REMOVED
     key_id = user2_api_key["id"]
     update_data = {"description": "User 2 updated this fixture key"}
     response = await authenticated_async_client_user2.put(
@@ -335,12 +285,10 @@ async def test_user2_update_own_api_key(
     assert data["id"] == key_id
     assert data["description"] == update_data["description"]
 
-@pytest.mark.asyncio
 async def test_user2_delete_own_api_key(
     authenticated_async_client_user2: AsyncClient
 ) -> None:
     """Test user2 deleting their own API key (creates its own)."""
-    # assert hasattr(pytest, "user2_api_key_id"), "User2 API Key ID not set" # REMOVED
     # Create a key specifically for this test to delete
     key_data = {
         "name": f"test-user2-delete-{uuid4()}",
@@ -361,17 +309,14 @@ async def test_user2_delete_own_api_key(
 
 # --- Key Expiry Tests ---
 
-from datetime import datetime, timedelta, timezone
-import time
-
-@pytest.mark.asyncio
 async def test_api_key_expiry(
     authenticated_async_client: AsyncClient, # Superuser creates the key
     async_client: AsyncClient, # Use unauthenticated client for API key auth tests
+    db_session: AsyncSession, # Used to move the key's expiry into the past
 ) -> None:
     """Test API key authentication before and after expiry."""
-    # 1. Create a key that expires in a short time (e.g., 5 seconds)
-    expiry_time = datetime.now(timezone.utc) + timedelta(seconds=5)
+    # 1. Create a key that is still valid for now
+    expiry_time = datetime.now(timezone.utc) + timedelta(hours=1)
     expiry_key_data = {
         "name": f"pytest-expiry-key-{uuid4()}",
         "scope": APIKeyScope.GLOBAL.value,
@@ -382,11 +327,11 @@ async def test_api_key_expiry(
     created_key_info = response_create.json()
     expiring_key_value = created_key_info["key"]
     expiring_key_id = created_key_info["id"]
-    print(f"Created key {expiring_key_id} expiring at {expiry_time.isoformat()}")
+    logger.debug("Created key %s expiring at %s", expiring_key_id, expiry_time)
 
     # 2. Test authentication with the key BEFORE expiry (e.g., get /users/me)
     headers_before = {API_KEY_NAME: expiring_key_value} # Use defined constant
-    print(f"Testing auth with key {expiring_key_id} BEFORE expiry using header: {API_KEY_NAME}")
+    logger.debug("Testing auth with key %s BEFORE expiry using header: %s", expiring_key_id, API_KEY_NAME)
     # Use the base async_client (unauthenticated by default) and add the API key header
     response_before = await async_client.get("/api/v1/users/me", headers=headers_before)
     # Need to know which user the key belongs to. The fixture creates it as superuser.
@@ -394,25 +339,24 @@ async def test_api_key_expiry(
     assert response_before.status_code == status.HTTP_200_OK, f"Auth failed before expiry: {response_before.text}"
     user_data = response_before.json()
     # Assuming the superuser client used belongs to settings.TEST_USER_EMAIL
-    from virtualstack.core.config import settings # Need settings for email
     assert user_data.get("email") == settings.TEST_USER_EMAIL
-    print("Auth successful before expiry.")
+    logger.debug("Auth successful before expiry.")
 
-    # 3. Wait until AFTER expiry
-    wait_time = 6 # Wait 6 seconds to be safe
-    print(f"Waiting {wait_time} seconds for key to expire...")
-    time.sleep(wait_time)
-    print("Wait complete.")
+    # 3. Expire the key by moving expires_at into the past instead of sleeping past it
+    await db_session.execute(
+        update(APIKey)
+        .where(APIKey.id == UUID(expiring_key_id))
+        .values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    )
+    await db_session.commit()
+    logger.debug("Key expiry moved into the past.")
 
     # 4. Test authentication with the key AFTER expiry (should fail)
     headers_after = {API_KEY_NAME: expiring_key_value} # Use defined constant
-    print(f"Testing auth with key {expiring_key_id} AFTER expiry using header: {API_KEY_NAME}")
+    logger.debug("Testing auth with key %s AFTER expiry using header: %s", expiring_key_id, API_KEY_NAME)
     response_after = await async_client.get("/api/v1/users/me", headers=headers_after)
     # Expect 401 Unauthorized because the API key validation should fail
     assert response_after.status_code == status.HTTP_401_UNAUTHORIZED, f"Auth did not fail after expiry: {response_after.status_code}"
     # Check for the specific detail message we raise in deps.py
     assert "invalid or expired api key" in response_after.text.lower()
-    print("Auth failed after expiry as expected.")
-
-    # Cleanup: Delete the expired key (optional, but good practice)
-    await authenticated_async_client.delete(f"/api/v1/api-keys/{expiring_key_id}")
+    logger.debug("Auth failed after expiry as expected.")
@@ -0,0 +1,30 @@
+from uuid import UUID, uuid4
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from virtualstack.models.iam import User
+from virtualstack.schemas.iam.tenant import TenantCreate
+from virtualstack.services.iam import tenant_service, user_service
+
+
+# CRUDBase.get is a lambda statement: SQLAlchemy caches the SQL built from the lambda on its
+# first call. Each later call must still bind its own record_id and query its own model.
+async def test_crud_get_binds_each_call(db_session: AsyncSession, seed_data: dict):
+    """Test CRUDBase.get returns the requested row on every call despite the cached statement."""
+    tenants = []
+    for _ in range(2):
+        name = f"pytest-crud-get-{uuid4().hex[:8]}"
+        tenants.append(await tenant_service.create(db_session, obj_in=TenantCreate(name=name, slug=name)))
+
+    # Same model, different IDs: each call binds its own record_id
+    for tenant in tenants:
+        fetched = await tenant_service.get(db_session, record_id=tenant.id)
+        assert fetched is not None
+        assert fetched.id == tenant.id
+    assert await tenant_service.get(db_session, record_id=UUID(int=0)) is None
+
+    # Same lambda, different service: the captured model is part of the cache key
+    user2_id = seed_data["user2"].id
+    fetched_user = await user_service.get(db_session, record_id=user2_id)
+    assert isinstance(fetched_user, User)
+    assert fetched_user.id == user2_id
@@ -3,13 +3,9 @@ from httpx import AsyncClient
 from fastapi import status
 
 
-@pytest.mark.asyncio
-async def test_health_check(async_client: AsyncClient):
-    """Test the root health check endpoint."""
-    response = await async_client.get("/")
-    assert response.status_code == status.HTTP_200_OK
-    assert response.json()["status"] == "healthy"
-
-    response = await async_client.get("/health")
+@pytest.mark.parametrize("path", ["/", "/health"])
+async def test_health_check(async_client: AsyncClient, path: str):
+    """Test the root and dedicated health check endpoints."""
+    response = await async_client.get(path)
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["status"] == "healthy"
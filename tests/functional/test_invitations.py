@@ -1,234 +0,0 @@
-import pytest
-from httpx import AsyncClient
-from fastapi import status
-from sqlalchemy.ext.asyncio import AsyncSession
-from uuid import uuid4
-import logging # Import logging
-
-from virtualstack.schemas.iam.invitation import InvitationStatus
-# Removed unused service/model imports
-# from virtualstack.services.iam import user_service
-# from virtualstack.models.iam.user_tenant_role import user_tenant_roles_table
-
-# No longer need settings import if test_extract_token_from_link is removed
-# from virtualstack.core.config import settings
-
-logger = logging.getLogger(__name__)
-
-# Test data creation (MODIFIED - removed link assertion)
-@pytest.mark.asyncio
-async def test_create_invitation(authenticated_async_client: AsyncClient, setup_invitation_dependencies: dict):
-    """Test creating a new invitation."""
-    tenant_id = setup_invitation_dependencies["tenant_id"]
-    role_id = setup_invitation_dependencies["role_id"]
-    email = f"invitee-{uuid4()}@example.com"
-
-    invitation_data = {
-        "email": email,
-        "tenant_id": str(tenant_id),
-        "role_id": str(role_id),
-    }
-
-    response = await authenticated_async_client.post("/api/v1/invitations/", json=invitation_data)
-
-    assert response.status_code == status.HTTP_201_CREATED
-    response_data = response.json()
-    assert response_data["email"] == email
-    assert response_data["tenant_id"] == str(tenant_id)
-    assert response_data["role_id"] == str(role_id)
-    assert response_data["status"] == InvitationStatus.PENDING.value
-    assert "token" in response_data
-    assert response_data["token"] # Ensure token is not empty
-    # Removed assertion for invitation_link
-
-# Removed test_extract_token_from_link function entirely
-
-# Test verifying a valid token
-@pytest.mark.asyncio
-async def test_verify_invitation_token(authenticated_async_client: AsyncClient, setup_invitation_dependencies: dict):
-    """Test verifying a valid invitation token."""
-    # Setup: Create an invitation within this test
-    tenant_id = setup_invitation_dependencies["tenant_id"]
-    role_id = setup_invitation_dependencies["role_id"]
-    email = f"verify-invitee-{uuid4()}@example.com"
-    invitation_data = {
-        "email": email,
-        "tenant_id": str(tenant_id),
-        "role_id": str(role_id),
-    }
-    response_create = await authenticated_async_client.post("/api/v1/invitations/", json=invitation_data)
-    assert response_create.status_code == status.HTTP_201_CREATED
-    token_to_verify = response_create.json()["token"]
-
-    # Test: Verify the created token
-    response = await authenticated_async_client.post("/api/v1/invitations/verify", json={"token": token_to_verify})
-
-    assert response.status_code == status.HTTP_200_OK, f"Failed: {response.text}"
-    response_data = response.json()
-    assert response_data["valid"] is True
-    assert response_data["email"] == email
-    assert response_data["tenant_id"] == str(tenant_id)
-    assert response_data["role_id"] == str(role_id)
-
-# Test verifying an invalid token
-@pytest.mark.asyncio
-async def test_verify_invalid_token(authenticated_async_client: AsyncClient):
-    """Test verifying an invalid token returns 400."""
-    invalid_token = "invalid-token-string"
-    response = await authenticated_async_client.post("/api/v1/invitations/verify", json={"token": invalid_token})
-    assert response.status_code == status.HTTP_400_BAD_REQUEST
-    # Optionally check the detail message
-    assert "invalid or expired" in response.json().get("detail", "").lower()
-
-# Test getting invitation details by ID (MODIFIED - removed tenant_name assertion)
-@pytest.mark.asyncio
-async def test_get_invitation_by_id(authenticated_async_client: AsyncClient, setup_invitation_dependencies: dict):
-    """Test getting invitation details by ID."""
-    # Setup: Create an invitation within this test
-    tenant_id = setup_invitation_dependencies["tenant_id"]
-    role_id = setup_invitation_dependencies["role_id"]
-    email = f"get-invitee-{uuid4()}@example.com"
-    invitation_data = {
-        "email": email,
-        "tenant_id": str(tenant_id),
-        "role_id": str(role_id),
-    }
-    response_create = await authenticated_async_client.post("/api/v1/invitations/", json=invitation_data)
-    assert response_create.status_code == status.HTTP_201_CREATED
-    invitation_id_to_get = response_create.json()["id"]
-    inviter_email = "admin@virtualstack.example" # Assuming admin client creates it
-
-    # Test: Get the created invitation by its ID
-    response = await authenticated_async_client.get(f"/api/v1/invitations/{invitation_id_to_get}")
-
-    assert response.status_code == status.HTTP_200_OK, f"Failed: {response.text}"
-    response_data = response.json()
-    assert response_data["id"] == invitation_id_to_get
-    assert response_data["email"] == email
-    assert response_data["tenant_id"] == str(tenant_id)
-    assert response_data["role_id"] == str(role_id)
-    assert response_data["status"] == InvitationStatus.PENDING.value
-    assert response_data["inviter_email"] == inviter_email
-    # Removed assertion for exact tenant_name match
-    assert "tenant_name" in response_data # Check that the field exists
-
-# Test listing pending invitations
-@pytest.mark.asyncio
-async def test_list_pending_invitations(authenticated_async_client: AsyncClient, setup_invitation_dependencies: dict):
-    """Test listing pending invitations for the tenant."""
-    tenant_id = setup_invitation_dependencies["tenant_id"]
-
-    # Create an invitation first to ensure one exists
-    role_id = setup_invitation_dependencies["role_id"]
-    email = f"list-test-{uuid4()}@example.com"
-    invitation_data = {
-        "email": email,
-        "tenant_id": str(tenant_id),
-        "role_id": str(role_id),
-    }
-    response_create = await authenticated_async_client.post("/api/v1/invitations/", json=invitation_data)
-    assert response_create.status_code == status.HTTP_201_CREATED
-    created_invitation_id = response_create.json()["id"]
-
-    # Now list pending invitations for that tenant using the query parameter
-    response = await authenticated_async_client.get(f"/api/v1/invitations/?tenant_id={tenant_id}&status=pending")
-    assert response.status_code == status.HTTP_200_OK, f"Failed: {response.text}"
-    invitations = response.json()
-    assert isinstance(invitations, list)
-    # Find the created invitation in the list
-    found = any(inv["id"] == created_invitation_id and inv["email"] == email for inv in invitations)
-    assert found, "Created pending invitation not found in the list"
-
-# Test revoking an invitation
-@pytest.mark.asyncio
-async def test_revoke_invitation(authenticated_async_client: AsyncClient, setup_invitation_dependencies: dict):
-    """Test revoking an invitation."""
-    # Setup: Create an invitation within this test
-    tenant_id = setup_invitation_dependencies["tenant_id"]
-    role_id = setup_invitation_dependencies["role_id"]
-    email = f"revoke-invitee-{uuid4()}@example.com"
-    invitation_data = {
-        "email": email,
-        "tenant_id": str(tenant_id),
-        "role_id": str(role_id),
-    }
-    response_create = await authenticated_async_client.post("/api/v1/invitations/", json=invitation_data)
-    assert response_create.status_code == status.HTTP_201_CREATED
-    invitation_id_to_revoke = response_create.json()["id"]
-
-    # Test: Revoke the created invitation
-    response = await authenticated_async_client.post(f"/api/v1/invitations/{invitation_id_to_revoke}/revoke")
-
-    assert response.status_code == status.HTTP_200_OK, f"Failed: {response.text}"
-    response_data = response.json()
-    assert response_data["id"] == invitation_id_to_revoke
-    assert response_data["status"] == InvitationStatus.REVOKED.value
-
-    # Verify: Try to verify the revoked token (should fail)
-    token_to_verify = response_create.json()["token"] # Get token from original creation response
-    response_verify = await authenticated_async_client.post("/api/v1/invitations/verify", json={"token": token_to_verify})
-    assert response_verify.status_code == status.HTTP_400_BAD_REQUEST
-
-# Test accepting an invitation (MODIFIED - changed user ID assertion)
-@pytest.mark.asyncio
-async def test_accept_invitation_with_role(
-    authenticated_async_client: AsyncClient, # Inviter client
-    # authenticated_async_client_user2: AsyncClient, # Invitee client (not needed for this test flow)
-    db_session: AsyncSession, # Keep db_session if needed for DB verification later
-    setup_invitation_dependencies: dict # Request the setup fixture
-):
-    """Test accepting an invitation that includes a role assignment."""
-    tenant_id = setup_invitation_dependencies["tenant_id"]
-    role_id = setup_invitation_dependencies["role_id"]
-    # Removed assertion for pytest.user2_id as we are testing new user creation flow
-    # assert hasattr(pytest, "user2_id"), "Test user2 ID not set"
-    # user2_id = pytest.user2_id
-
-    # 1. Inviter creates a new invitation for a NEW email address
-    invite_email = f"invited.user.accept-{uuid4()}@example.com"
-    invitation_data = {
-        "email": invite_email,
-        "tenant_id": str(tenant_id),
-        "role_id": str(role_id),
-    }
-    response_create = await authenticated_async_client.post("/api/v1/invitations/", json=invitation_data)
-    assert response_create.status_code == status.HTTP_201_CREATED
-    invitation_details = response_create.json()
-    new_invitation_token = invitation_details["token"]
-    new_invitation_id = invitation_details["id"]
-
-    # 2. Use the public accept endpoint with the token and new user details
-    accept_data = {
-        "token": new_invitation_token,
-        "password": "a-secure-password123!",
-        "first_name": "InvitedAccept",
-        "last_name": "User"
-    }
-    response_accept = await authenticated_async_client.post("/api/v1/invitations/accept", json=accept_data)
-    assert response_accept.status_code == status.HTTP_200_OK, f"Failed to accept: {response_accept.text}"
-
-    # 3. Verify the response contains the details of the NEWLY CREATED user
-    accept_details = response_accept.json()
-    assert accept_details["email"] == invite_email # Check the correct email was used/returned
-    assert accept_details["first_name"] == "InvitedAccept"
-    newly_created_user_id = accept_details["id"]
-
-    # 4. Verify the invitation status is now ACCEPTED
-    response_get = await authenticated_async_client.get(f"/api/v1/invitations/{new_invitation_id}")
-    assert response_get.status_code == status.HTTP_200_OK
-    get_details = response_get.json()
-    assert get_details["status"] == InvitationStatus.ACCEPTED.value
-    assert get_details["user_id"] == newly_created_user_id
-
-    # 5. Verify the user was added to the correct tenant and assigned the role
-    # TODO: Add specific verification for role assignment in DB using db_session
-    # Example (needs adjustment based on actual table/columns):
-    # stmt = select(user_tenant_roles_table).where(
-    #     user_tenant_roles_table.c.user_id == newly_created_user_id,
-    #     user_tenant_roles_table.c.tenant_id == tenant_id,
-    #     user_tenant_roles_table.c.role_id == role_id
-    # )
-    # result = await db_session.execute(stmt)
-    # assignment = result.fetchone()
-    # assert assignment is not None, f"Role {role_id} was not assigned to user {newly_created_user_id} in tenant {tenant_id}"
-    logger.info(f"TODO: Verify role assignment for user {newly_created_user_id} in DB") 
\ No newline at end of file
@@ -0,0 +1,123 @@
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy import exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID, uuid4
+import logging # Import logging
+
+from conftest import INVITATION_ACCEPT_URL, INVITATIONS_URL, INVITATION_VERIFY_URL
+from virtualstack.models.iam.user_tenant_role import user_tenant_roles_table
+from virtualstack.schemas.iam.invitation import InvitationStatus
+
+logger = logging.getLogger(__name__)
+
+# Invitation tests that create or change invitations run together on one xdist worker
+# (with --dist loadgroup); each uses its own invitation from fresh_invitation.
+# PROFILE=1 writes a pyinstrument report per test (see profile_test in conftest.py).
+pytestmark = [pytest.mark.xdist_group("invitation-mutations"), pytest.mark.usefixtures("profile_test")]
+
+# Test data creation (MODIFIED - removed link assertion)
+async def test_create_invitation(authenticated_async_client: AsyncClient, setup_invitation_dependencies: dict):
+    """Test creating a new invitation."""
+    tenant_id = setup_invitation_dependencies["tenant_id"]
+    role_id = setup_invitation_dependencies["role_id"]
+    email = f"invitee-{uuid4()}@example.com"
+
+    invitation_data = {
+        "email": email,
+        "tenant_id": str(tenant_id),
+        "role_id": str(role_id),
+    }
+
+    response = await authenticated_async_client.post(INVITATIONS_URL, json=invitation_data)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    response_data = response.json()
+    assert response_data["email"] == email
+    assert response_data["tenant_id"] == str(tenant_id)
+    assert response_data["role_id"] == str(role_id)
+    assert response_data["status"] == InvitationStatus.PENDING.value
+    assert "token" in response_data
+    assert response_data["token"] # Ensure token is not empty
+    # Removed assertion for invitation_link
+
+# Removed test_extract_token_from_link function entirely
+
+# Test revoking an invitation
+async def test_revoke_invitation(fresh_invitation: dict, authenticated_async_client: AsyncClient, setup_invitation_dependencies: dict):
+    """Test revoking an invitation."""
+    # Revoking changes state, so this test gets its own invitation
+    invitation_id_to_revoke = fresh_invitation["id"]
+
+    # Test: Revoke the created invitation
+    response = await authenticated_async_client.post(f"{INVITATIONS_URL}{invitation_id_to_revoke}/revoke")
+
+    assert response.status_code == status.HTTP_200_OK, f"Failed: {response.text}"
+    response_data = response.json()
+    assert response_data["id"] == invitation_id_to_revoke
+    assert response_data["status"] == InvitationStatus.REVOKED.value
+
+    # Verify: the revoked token no longer verifies and the invitation left the pending list.
+    # Requests run one at a time, since they share the per-test db_session (see conftest)
+    tenant_id = setup_invitation_dependencies["tenant_id"]
+    token_to_verify = fresh_invitation["token"] # Token from the invitation's creation response
+    response_verify = await authenticated_async_client.post(INVITATION_VERIFY_URL, json={"token": token_to_verify})
+    response_list = await authenticated_async_client.get(
+        INVITATIONS_URL, params={"tenant_id": str(tenant_id), "status": "pending"}
+    )
+    assert response_verify.status_code == status.HTTP_400_BAD_REQUEST
+    assert response_list.status_code == status.HTTP_200_OK, f"Failed: {response_list.text}"
+    assert invitation_id_to_revoke not in {inv["id"] for inv in response_list.json()}
+
+# Test accepting an invitation (MODIFIED - changed user ID assertion)
+async def test_accept_invitation_with_role(
+    authenticated_async_client: AsyncClient, # Inviter client
+    # authenticated_async_client_user2: AsyncClient, # Invitee client (not needed for this test flow)
+    db_session: AsyncSession, # Same per-test session the endpoint wrote through; used for DB verification
+    setup_invitation_dependencies: dict, # Request the setup fixture
+    fresh_invitation: dict, # Accepting changes state, so this test gets its own invitation
+):
+    """Test accepting an invitation that includes a role assignment."""
+    tenant_id = setup_invitation_dependencies["tenant_id"]
+    role_id = setup_invitation_dependencies["role_id"]
+    # 1. The fixture created a new invitation for a NEW email address
+    invite_email = fresh_invitation["email"]
+    new_invitation_token = fresh_invitation["token"]
+    new_invitation_id = fresh_invitation["id"]
+
+    # 2. Use the public accept endpoint with the token and new user details
+    accept_data = {
+        "token": new_invitation_token,
+        "password": "a-secure-password123!",
+        "first_name": "InvitedAccept",
+        "last_name": "User"
+    }
+    response_accept = await authenticated_async_client.post(INVITATION_ACCEPT_URL, json=accept_data)
+    assert response_accept.status_code == status.HTTP_200_OK, f"Failed to accept: {response_accept.text}"
+
+    # 3. Verify the response contains the details of the NEWLY CREATED user
+    accept_details = response_accept.json()
+    assert accept_details["email"] == invite_email # Check the correct email was used/returned
+    assert accept_details["first_name"] == "InvitedAccept"
+    newly_created_user_id = accept_details["id"]
+
+    # 4. Verify the invitation status is now ACCEPTED
+    response_get = await authenticated_async_client.get(f"{INVITATIONS_URL}{new_invitation_id}")
+    assert response_get.status_code == status.HTTP_200_OK
+    get_details = response_get.json()
+    assert get_details["status"] == InvitationStatus.ACCEPTED.value
+    assert get_details["user_id"] == newly_created_user_id
+
+    # 5. Verify the user was added to the correct tenant and assigned the role.
+    # EXISTS lets Postgres stop at the first index hit and returns a single boolean.
+    role_assigned = await db_session.scalar(
+        select(
+            exists().where(
+                user_tenant_roles_table.c.user_id == UUID(newly_created_user_id),
+                user_tenant_roles_table.c.tenant_id == tenant_id,
+                user_tenant_roles_table.c.role_id == role_id,
+            )
+        )
+    )
+    assert role_assigned, f"Role {role_id} was not assigned to user {newly_created_user_id} in tenant {tenant_id}"
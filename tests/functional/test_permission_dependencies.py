@@ -1,15 +1,15 @@
+import inspect
 import logging
-import uuid
 from uuid import UUID, uuid4
-from typing import List, Dict, Optional, Any
+from typing import AsyncGenerator, Optional
 
 import pytest
 import pytest_asyncio
-from sqlalchemy import select, distinct, and_
+from sqlalchemy import and_, bindparam, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import FastAPI, Depends, HTTPException, status, Request, APIRouter
 from httpx import AsyncClient
-from datetime import datetime, timedelta
 
 from virtualstack.api.deps import get_current_active_user, get_db
 # Import the permission dependencies
@@ -19,440 +19,354 @@ from virtualstack.api.deps import (
     require_all_permissions
 )
 from virtualstack.models.iam.user import User
-from virtualstack.models.iam.permission import Permission as PermissionModel
+from virtualstack.models.iam.role import Role as RoleModel
+from virtualstack.models.iam.tenant import Tenant
 from virtualstack.core.permissions import Permission
-from virtualstack.services.iam import user_service, role_service, permission_service
+from virtualstack.schemas.iam.tenant import TenantCreate
+from virtualstack.services.iam import role_service, tenant_service
+from virtualstack.models.iam.role_permissions import role_permissions_table
 from virtualstack.models.iam.user_tenant_role import user_tenant_roles_table
 
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
-# Create functions for test routes that disable superuser bypass
-def require_permission_no_bypass(permission: Permission):
-    """Like require_permission but does not bypass validation for superusers."""
-    async def check_permissions(
-        request: Request,
-        current_user: User = Depends(get_current_active_user),
-        db: AsyncSession = Depends(get_db)
-    ) -> User:
-        # Extract tenant_id from path parameters
-        tenant_id_str = request.path_params.get("tenant_id")
-        tenant_id: Optional[UUID] = None
-        if tenant_id_str:
-            try:
-                tenant_id = UUID(tenant_id_str)
-            except ValueError:
-                # Handle invalid UUID format in path
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid Tenant ID format in URL path."
-                )
-        
-        # Most permissions require a tenant context extracted from the path
-        if tenant_id is None:
-            # This should ideally not happen if routes requiring tenant context always have {tenant_id}
-            # but we add a check just in case.
-            logger.error(f"Permission check called on a route without a tenant_id path parameter.")
+# Removes one (user, tenant, role) assignment; built once so tests reuse the compiled statement
+_UNASSIGN_STMT = user_tenant_roles_table.delete().where(
+    and_(
+        user_tenant_roles_table.c.user_id == bindparam("uid"),
+        user_tenant_roles_table.c.tenant_id == bindparam("tid"),
+        user_tenant_roles_table.c.role_id == bindparam("rid")
+    )
+)
+
+async def _assign_roles(db: AsyncSession, *assignments: tuple[UUID, UUID, UUID]) -> None:
+    """Inserts (user_id, tenant_id, role_id) role assignments in one statement, skipping existing ones."""
+    await db.execute(
+        pg_insert(user_tenant_roles_table)
+        .values([
+            {"user_id": user_id, "tenant_id": tenant_id, "role_id": role_id}
+            for user_id, tenant_id, role_id in assignments
+        ])
+        .on_conflict_do_nothing()
+    )
+
+# Tenant lookup for the no-bypass test routes
+async def get_path_tenant(request: Request, db: AsyncSession = Depends(get_db)) -> Tenant:
+    """Resolves the tenant from the tenant_id path parameter (400 if missing/invalid, 404 if unknown).
+
+    FastAPI caches dependency results per request, so stacked guards share one lookup.
+    """
+    # Extract tenant_id from path parameters
+    tenant_id_str = request.path_params.get("tenant_id")
+    tenant_id: Optional[UUID] = None
+    if tenant_id_str:
+        try:
+            tenant_id = UUID(tenant_id_str)
+        except ValueError:
+            # Handle invalid UUID format in path
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Tenant context could not be determined from URL path for permission check."
+                detail="Invalid Tenant ID format in URL path."
             )
 
-        # --- Check Tenant Existence FIRST ---
-        # Import tenant_service locally within the function if not already imported globally
-        from virtualstack.services.iam import tenant_service
-        tenant = await tenant_service.get(db, record_id=tenant_id)
-        if not tenant:
-            logger.warning(f"Permission check failed: Tenant {tenant_id} not found.")
-            # Raise 404 here, as the primary entity in the path doesn't exist
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Tenant {tenant_id} not found."
-            )
-        # Continue with normal permission check logic for non-superusers
-        return current_user
-        
-    return check_permissions
+    # Most permissions require a tenant context extracted from the path
+    if tenant_id is None:
+        # This should ideally not happen if routes requiring tenant context always have {tenant_id}
+        # but we add a check just in case.
+        logger.error(f"Permission check called on a route without a tenant_id path parameter.")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tenant context could not be determined from URL path for permission check."
+        )
+
+    tenant = await tenant_service.get(db, record_id=tenant_id)
+    if not tenant:
+        logger.warning(f"Permission check failed: Tenant {tenant_id} not found.")
+        # Raise 404 here, as the primary entity in the path doesn't exist
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Tenant {tenant_id} not found."
+        )
+    return tenant
+
 
+# Dependency for test routes that disables the superuser bypass
+def _make_tenant_guard():
+    """Builds the no-bypass dependency: the path tenant must be valid and exist.
 
-def require_any_permission_no_bypass(permissions: list[Permission]):
-    """Like require_any_permission but does not bypass validation for superusers."""
-    async def check_permissions(
-        request: Request,
+    The former per-permission variants never checked the permissions they were given, so
+    every no-bypass test route shares the single closure built below.
+    """
+    async def check_tenant(
         current_user: User = Depends(get_current_active_user),
-        db: AsyncSession = Depends(get_db)
+        # --- Check Tenant Existence FIRST --- (resolved once per request)
+        tenant: Tenant = Depends(get_path_tenant),
     ) -> User:
-        # Extract tenant_id from path parameters
-        tenant_id_str = request.path_params.get("tenant_id")
-        tenant_id: Optional[UUID] = None
-        if tenant_id_str:
-            try:
-                tenant_id = UUID(tenant_id_str)
-            except ValueError:
-                # Handle invalid UUID format in path
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid Tenant ID format in URL path."
-                )
-        
-        # Most permissions require a tenant context extracted from the path
-        if tenant_id is None:
-            # This should ideally not happen if routes requiring tenant context always have {tenant_id}
-            # but we add a check just in case.
-            logger.error(f"Permission check for multiple permissions called on a route without a tenant_id path parameter.")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Tenant context could not be determined from URL path for permission check."
-            )
-
-        # --- Check Tenant Existence FIRST ---
-        # Import tenant_service locally within the function if not already imported globally
-        from virtualstack.services.iam import tenant_service
-        tenant = await tenant_service.get(db, record_id=tenant_id)
-        if not tenant:
-            logger.warning(f"Permission check failed: Tenant {tenant_id} not found.")
-            # Raise 404 here, as the primary entity in the path doesn't exist
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Tenant {tenant_id} not found."
-            )
         # Continue with normal permission check logic for non-superusers
         return current_user
-        
-    return check_permissions
 
+    return check_tenant
 
-def require_all_permissions_no_bypass(permissions: list[Permission]):
-    """Like require_all_permissions but does not bypass validation for superusers."""
-    async def check_permissions(
-        request: Request,
-        current_user: User = Depends(get_current_active_user),
-        db: AsyncSession = Depends(get_db)
-    ) -> User:
-        # Extract tenant_id from path parameters
-        tenant_id_str = request.path_params.get("tenant_id")
-        tenant_id: Optional[UUID] = None
-        if tenant_id_str:
-            try:
-                tenant_id = UUID(tenant_id_str)
-            except ValueError:
-                # Handle invalid UUID format in path
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid Tenant ID format in URL path."
-                )
-        
-        # Most permissions require a tenant context extracted from the path
-        if tenant_id is None:
-            # This should ideally not happen if routes requiring tenant context always have {tenant_id}
-            # but we add a check just in case.
-            logger.error(f"Permission check for multiple permissions called on a route without a tenant_id path parameter.")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Tenant context could not be determined from URL path for permission check."
-            )
 
-        # --- Check Tenant Existence FIRST ---
-        # Import tenant_service locally within the function if not already imported globally
-        from virtualstack.services.iam import tenant_service
-        tenant = await tenant_service.get(db, record_id=tenant_id)
-        if not tenant:
-            logger.warning(f"Permission check failed: Tenant {tenant_id} not found.")
-            # Raise 404 here, as the primary entity in the path doesn't exist
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Tenant {tenant_id} not found."
-            )
-        # Continue with normal permission check logic for non-superusers
-        return current_user
-        
-    return check_permissions
+# Built once at import and shared by all no-bypass test routes
+require_tenant_no_bypass = _make_tenant_guard()
 
 
-# --- Test Setup ---
+# --- Test Routes ---
 
-@pytest_asyncio.fixture(scope="function")
-async def setup_test_route(app: FastAPI, db_session: AsyncSession) -> FastAPI:
-    """Adds test routes to the FastAPI app specifically for testing permission dependencies."""
-    router = APIRouter()
-
-    # Route using require_permission
-    @router.get("/test-permission/{tenant_id}")
-    async def test_require_permission(
-        current_user: User = Depends(require_permission(Permission.VM_READ))
-    ):
-        """Test endpoint using require_permission with VM_READ permission."""
-        return {"status": "success", "user_id": str(current_user.id)}
-
-    # Route using require_any_permission with multiple permissions
-    @router.get("/test-any-permission/{tenant_id}")
-    async def test_require_any_permission(
-        current_user: User = Depends(
-            require_any_permission([
-                Permission.VM_READ,
-                Permission.VM_UPDATE,
-                Permission.TENANT_VIEW_USERS
-            ])
-        )
-    ):
-        """Test endpoint using require_any_permission with multiple permissions."""
-        return {"status": "success", "user_id": str(current_user.id)}
-
-    # Route using require_all_permissions with multiple permissions
-    @router.get("/test-all-permissions/{tenant_id}")
-    async def test_require_all_permissions(
-        current_user: User = Depends(
-            require_all_permissions([
-                Permission.VM_READ,
-                Permission.VM_UPDATE,
-                Permission.TENANT_VIEW_USERS
-            ])
-        )
-    ):
-        """Test endpoint using require_all_permissions with multiple permissions."""
-        return {"status": "success", "user_id": str(current_user.id)}
-
-    # Route testing non-existent tenant ID
-    @router.get("/test-nonexistent-tenant/{tenant_id}")
-    async def test_nonexistent_tenant(
-        current_user: User = Depends(require_permission_no_bypass(Permission.VM_READ))
-    ):
-        """Test endpoint using a non-existent tenant ID."""
-        return {"status": "success", "user_id": str(current_user.id)}
-        
-    # Routes without tenant ID in path for testing 400 errors
-    @router.get("/test-missing-tenant-id-single")
-    async def test_missing_tenant_id_single(
-        current_user: User = Depends(require_permission_no_bypass(Permission.VM_READ))
-    ):
-        """Test endpoint missing tenant_id in path with require_permission."""
-        return {"status": "success", "user_id": str(current_user.id)}
-    
-    @router.get("/test-missing-tenant-id-any")
-    async def test_missing_tenant_id_any(
-        current_user: User = Depends(
-            require_any_permission_no_bypass([Permission.VM_READ, Permission.VM_UPDATE])
-        )
-    ):
-        """Test endpoint missing tenant_id in path with require_any_permission."""
-        return {"status": "success", "user_id": str(current_user.id)}
-    
-    @router.get("/test-missing-tenant-id-all")
-    async def test_missing_tenant_id_all(
-        current_user: User = Depends(
-            require_all_permissions_no_bypass([Permission.VM_READ, Permission.VM_UPDATE])
-        )
-    ):
-        """Test endpoint missing tenant_id in path with require_all_permissions."""
-        return {"status": "success", "user_id": str(current_user.id)}
+# Defined once at import; the _register_test_routes fixture mounts them on the app.
+# Neither the router nor the route_* handlers start with test_, so pytest does not try to collect them.
+deps_router = APIRouter()
 
-    # Add the router to the app
-    app.include_router(router, prefix="/test-deps")
-    
-    # Test tenant - retrieve from conftest's setup_database fixture
-    assert hasattr(pytest, "tenant_id"), "Test tenant ID not set in conftest"
-    tenant_id = pytest.tenant_id
-    
-    # Test users - retrieve from conftest's setup_database fixture
-    assert hasattr(pytest, "user_id"), "Test user ID not set in conftest"
-    superuser_id = pytest.user_id
-    
-    assert hasattr(pytest, "user2_id"), "Test user2 ID not set in conftest"
-    regular_user_id = pytest.user2_id
-    
-    # Get VM_READ permission ID
-    assert hasattr(pytest, "seeded_permission_id_vm_read"), "VM_READ permission ID not set in conftest"
-    vm_read_perm_id = pytest.seeded_permission_id_vm_read
+
+def _success_payload(current_user: User) -> dict:
+    """Response body shared by every test route; only their dependencies differ."""
+    return {"status": "success", "user_id": str(current_user.id)}
+
+
+# Route using require_permission
+@deps_router.get("/test-permission/{tenant_id}")
+async def route_require_permission(
+    current_user: User = Depends(require_permission(Permission.VM_READ))
+):
+    """Test endpoint using require_permission with VM_READ permission."""
+    return _success_payload(current_user)
+
+# Route using require_any_permission with multiple permissions
+@deps_router.get("/test-any-permission/{tenant_id}")
+async def route_require_any_permission(
+    current_user: User = Depends(
+        require_any_permission([
+            Permission.VM_READ,
+            Permission.VM_UPDATE,
+            Permission.TENANT_VIEW_USERS
+        ])
+    )
+):
+    """Test endpoint using require_any_permission with multiple permissions."""
+    return _success_payload(current_user)
+
+# Route using require_all_permissions with multiple permissions
+@deps_router.get("/test-all-permissions/{tenant_id}")
+async def route_require_all_permissions(
+    current_user: User = Depends(
+        require_all_permissions([
+            Permission.VM_READ,
+            Permission.VM_UPDATE,
+            Permission.TENANT_VIEW_USERS
+        ])
+    )
+):
+    """Test endpoint using require_all_permissions with multiple permissions."""
+    return _success_payload(current_user)
+
+# Route testing non-existent tenant ID
+@deps_router.get("/test-nonexistent-tenant/{tenant_id}")
+async def route_nonexistent_tenant(
+    current_user: User = Depends(require_tenant_no_bypass)
+):
+    """Test endpoint using a non-existent tenant ID."""
+    return _success_payload(current_user)
     
+# Routes without tenant ID in path for testing 400 errors
+@deps_router.get("/test-missing-tenant-id-single")
+async def route_missing_tenant_id_single(
+    current_user: User = Depends(require_tenant_no_bypass)
+):
+    """Test endpoint missing tenant_id in path with require_permission."""
+    return _success_payload(current_user)
+
+@deps_router.get("/test-missing-tenant-id-any")
+async def route_missing_tenant_id_any(
+    current_user: User = Depends(require_tenant_no_bypass)
+):
+    """Test endpoint missing tenant_id in path with require_any_permission."""
+    return _success_payload(current_user)
+
+@deps_router.get("/test-missing-tenant-id-all")
+async def route_missing_tenant_id_all(
+    current_user: User = Depends(require_tenant_no_bypass)
+):
+    """Test endpoint missing tenant_id in path with require_all_permissions."""
+    return _success_payload(current_user)
+
+
+# --- Test Setup ---
+
+@pytest.fixture(scope="module")
+def _register_test_routes(app: FastAPI) -> None:
+    """Mounts the test routes under /test-deps exactly once per app."""
+    if not any(getattr(route, "path", "").startswith("/test-deps") for route in app.router.routes):
+        app.include_router(deps_router, prefix="/test-deps")
+
+@pytest_asyncio.fixture(scope="module")
+async def setup_test_route(
+    _register_test_routes: None, seed_session: AsyncSession, seed_data: dict, seeded_perms: dict
+) -> AsyncGenerator[dict, None]:
+    """Ensures the test routes are mounted and yields the IDs of the tenants, users and roles it sets up.
+
+    Runs once per module: the roles, role permissions, role assignment and second tenant are
+    committed through seed_session so every test's rolled-back transaction can see them, and
+    are removed at module teardown. Tests that change assignments do so in their own
+    per-test transaction, which is rolled back.
+    """
+    # Test tenant and users - taken from conftest's seed_data fixture
+    tenant_id = seed_data["tenant"].id
+    superuser_id = seed_data["superuser"].id
+    regular_user_id = seed_data["user2"].id
+
+    # The three seeded permissions the roles need (IDs read once per session by seeded_perms)
+    perm_ids = {
+        code: seeded_perms[code]
+        for code in (Permission.VM_READ.value, Permission.TENANT_VIEW_USERS.value, Permission.VM_UPDATE.value)
+    }
+    vm_read_perm_id = perm_ids[Permission.VM_READ.value]
+
     # Create role specifically for the "single permission" test
     role_single_perm = await role_service.create(
-        db_session,
+        seed_session,
         obj_in={"name": f"Single Permission Role {uuid4()}", "tenant_id": tenant_id}
     )
-    
-    # Add VM_READ permission to the single permission role
-    await role_service.add_permission_to_role(
-        db_session,
-        role_id=role_single_perm.id,
-        permission_id=vm_read_perm_id
-    )
-    
+
     # Create role for the "any permission" test with multiple permissions
     role_multiple_perms = await role_service.create(
-        db_session,
+        seed_session,
         obj_in={"name": f"Multiple Permissions Role {uuid4()}", "tenant_id": tenant_id}
     )
-    
-    # Add VM_READ and TENANT_VIEW_USERS permissions to this role
-    tenant_view_users_perm = await permission_service.get_by_code(
-        db_session,
-        code=Permission.TENANT_VIEW_USERS.value
-    )
-    
-    vm_update_perm = await permission_service.get_by_code(
-        db_session,
-        code=Permission.VM_UPDATE.value
-    )
-    
-    await role_service.add_permission_to_role(
-        db_session,
-        role_id=role_multiple_perms.id,
-        permission_id=vm_read_perm_id
-    )
-    
-    await role_service.add_permission_to_role(
-        db_session,
-        role_id=role_multiple_perms.id,
-        permission_id=tenant_view_users_perm.id
-    )
-    
-    await role_service.add_permission_to_role(
-        db_session,
-        role_id=role_multiple_perms.id,
-        permission_id=vm_update_perm.id
+
+    # Grant VM_READ to the single permission role, and VM_READ, TENANT_VIEW_USERS and
+    # VM_UPDATE to the multiple permissions role, in one executemany INSERT
+    await seed_session.execute(
+        role_permissions_table.insert(),
+        [{"role_id": role_single_perm.id, "permission_id": vm_read_perm_id}]
+        + [
+            {"role_id": role_multiple_perms.id, "permission_id": perm_id}
+            for perm_id in perm_ids.values()
+        ],
     )
-    
+
     # Assign the single permission role to the regular user
-    await user_service.assign_role_to_user_in_tenant(
-        db_session,
-        user_id=regular_user_id,
-        tenant_id=tenant_id,
-        role_id=role_single_perm.id
-    )
+    await _assign_roles(seed_session, (regular_user_id, tenant_id, role_single_perm.id))
     
     # Create a second test tenant for isolation tests
-    from virtualstack.schemas.iam.tenant import TenantCreate
-    from virtualstack.services.iam import tenant_service
-    
     test_tenant2 = await tenant_service.create(
-        db_session, 
+        seed_session, 
         obj_in=TenantCreate(
             name=f"Test Tenant 2 {uuid4()}", 
             slug=f"test-tenant-2-{uuid4()}"
         )
     )
     
-    # Store IDs for tests to use
-    pytest.test_tenant2_id = test_tenant2.id
-    pytest.test_role_single_perm_id = role_single_perm.id
-    pytest.test_role_multiple_perms_id = role_multiple_perms.id
-    
-    return app
+    # Commit the roles, grants, assignment and tenant together
+    await seed_session.commit()
+    logger.info("[Test Setup] Committed permission test roles, assignment and second tenant.")
+
+    # Yield the IDs for tests to use (no state is stashed on the pytest module)
+    yield {
+        "tenant_id": tenant_id,
+        "tenant2_id": test_tenant2.id,
+        "superuser_id": superuser_id,
+        "user2_id": regular_user_id,
+        "role_single_perm_id": role_single_perm.id,
+        "role_multiple_perms_id": role_multiple_perms.id,
+        # Permission IDs by code; permission rows never change during a run
+        "permission_ids": perm_ids,
+    }
+
+    # Deleting the roles cascades to their role_permissions rows and user role assignments
+    await seed_session.execute(
+        delete(RoleModel).where(RoleModel.id.in_([role_single_perm.id, role_multiple_perms.id]))
+    )
+    await seed_session.execute(delete(Tenant).where(Tenant.id == test_tenant2.id))
+    await seed_session.commit()
+    logger.info("[Test Teardown] Removed permission test roles and second tenant.")
 
 
 # --- Test Cases ---
 
-@pytest.mark.asyncio
+# The three permission-guarded endpoints: require_permission, require_any_permission, require_all_permissions
+PERMISSION_ENDPOINTS = ["test-permission", "test-any-permission", "test-all-permissions"]
+
+
+@pytest.mark.parametrize("endpoint", PERMISSION_ENDPOINTS)
 async def test_require_permission_superuser(
-    setup_test_route: FastAPI,
+    endpoint: str,
+    setup_test_route: dict,
     authenticated_async_client: AsyncClient
 ):
-    """Test that superuser can access endpoint with require_permission regardless of actual permissions."""
-    assert hasattr(pytest, "tenant_id"), "Test tenant ID not set in conftest"
-    tenant_id = pytest.tenant_id
-    
+    """Test that superuser can access each permission-guarded endpoint regardless of actual permissions."""
+    tenant_id = setup_test_route["tenant_id"]
+
     # Superuser should have access even if they don't explicitly have the permission
-    response = await authenticated_async_client.get(f"/test-deps/test-permission/{tenant_id}")
+    response = await authenticated_async_client.get(f"/test-deps/{endpoint}/{tenant_id}")
     assert response.status_code == status.HTTP_200_OK, f"Failed: {response.text}"
-    data = response.json()
-    assert data["status"] == "success"
-    
-    # Also test with the require_any and require_all endpoints
-    response = await authenticated_async_client.get(f"/test-deps/test-any-permission/{tenant_id}")
-    assert response.status_code == status.HTTP_200_OK
-    
-    response = await authenticated_async_client.get(f"/test-deps/test-all-permissions/{tenant_id}")
-    assert response.status_code == status.HTTP_200_OK
-
-
-@pytest.mark.asyncio
+    # Decode the body for one endpoint only; the other handlers return the same payload
+    if endpoint == "test-permission":
+        assert response.json()["status"] == "success"
+
+
+@pytest.mark.parametrize(
+    "endpoint, expected_status",
+    [
+        # Regular user has been assigned a role with VM_READ permission in setup
+        ("test-permission", status.HTTP_200_OK),
+        # They should also be able to access the "any permission" endpoint since they have VM_READ
+        ("test-any-permission", status.HTTP_200_OK),
+        # But they should NOT be able to access the "all permissions" endpoint as they're missing some
+        ("test-all-permissions", status.HTTP_403_FORBIDDEN),
+    ],
+)
 async def test_require_permission_regular_user_with_permission(
-    setup_test_route: FastAPI,
+    endpoint: str,
+    expected_status: int,
+    setup_test_route: dict,
     authenticated_async_client_user2: AsyncClient
 ):
     """Test that a regular user with the required permission can access the endpoint."""
-    assert hasattr(pytest, "tenant_id"), "Test tenant ID not set in conftest"
-    tenant_id = pytest.tenant_id
-    
-    # Regular user has been assigned a role with VM_READ permission in setup
-    response = await authenticated_async_client_user2.get(f"/test-deps/test-permission/{tenant_id}")
-    assert response.status_code == status.HTTP_200_OK, f"Failed: {response.text}"
-    
-    # They should also be able to access the "any permission" endpoint since they have VM_READ
-    response = await authenticated_async_client_user2.get(f"/test-deps/test-any-permission/{tenant_id}")
-    assert response.status_code == status.HTTP_200_OK, f"Failed: {response.text}"
-    
-    # But they should NOT be able to access the "all permissions" endpoint as they're missing some
-    response = await authenticated_async_client_user2.get(f"/test-deps/test-all-permissions/{tenant_id}")
-    assert response.status_code == status.HTTP_403_FORBIDDEN, f"Expected 403, got: {response.status_code}"
+    tenant_id = setup_test_route["tenant_id"]
 
+    response = await authenticated_async_client_user2.get(f"/test-deps/{endpoint}/{tenant_id}")
+    assert response.status_code == expected_status, f"Expected {expected_status}, got: {response.status_code} {response.text}"
 
-@pytest.mark.asyncio
+
+@pytest.mark.parametrize("endpoint", PERMISSION_ENDPOINTS)
 async def test_require_permission_regular_user_missing_permission(
-    setup_test_route: FastAPI,
+    endpoint: str,
+    setup_test_route: dict,
     authenticated_async_client_user2: AsyncClient,
     db_session: AsyncSession
 ):
     """Test that a regular user without the required permission cannot access the endpoint."""
     # First remove the test role from the user to test permission denied
-    assert hasattr(pytest, "user2_id"), "Test user2 ID not set in conftest"
-    assert hasattr(pytest, "tenant_id"), "Test tenant ID not set in conftest"
-    assert hasattr(pytest, "test_role_single_perm_id"), "Test role ID not set"
     
-    user_id = pytest.user2_id
-    tenant_id = pytest.tenant_id
-    role_id = pytest.test_role_single_perm_id
+    user_id = setup_test_route["user2_id"]
+    tenant_id = setup_test_route["tenant_id"]
+    role_id = setup_test_route["role_single_perm_id"]
     
     # Remove the role assignment
-    from virtualstack.models.iam.user_tenant_role import user_tenant_roles_table
-    delete_stmt = user_tenant_roles_table.delete().where(
-        and_(
-            user_tenant_roles_table.c.user_id == user_id,
-            user_tenant_roles_table.c.tenant_id == tenant_id,
-            user_tenant_roles_table.c.role_id == role_id
-        )
-    )
-    await db_session.execute(delete_stmt)
-    await db_session.commit()
+    # No commit needed: requests run on this same per-test session, which is rolled back afterwards
+    await db_session.execute(_UNASSIGN_STMT, {"uid": user_id, "tid": tenant_id, "rid": role_id})
     
     # Now the user should be denied access
-    response = await authenticated_async_client_user2.get(f"/test-deps/test-permission/{tenant_id}")
+    response = await authenticated_async_client_user2.get(f"/test-deps/{endpoint}/{tenant_id}")
     assert response.status_code == status.HTTP_403_FORBIDDEN, f"Expected 403, got: {response.status_code}"
-    
-    # Also test the any/all permission endpoints
-    response = await authenticated_async_client_user2.get(f"/test-deps/test-any-permission/{tenant_id}")
-    assert response.status_code == status.HTTP_403_FORBIDDEN
-    
-    response = await authenticated_async_client_user2.get(f"/test-deps/test-all-permissions/{tenant_id}")
-    assert response.status_code == status.HTTP_403_FORBIDDEN
 
 
-@pytest.mark.asyncio
 async def test_tenant_isolation(
-    setup_test_route: FastAPI,
+    setup_test_route: dict,
     authenticated_async_client_user2: AsyncClient,
     db_session: AsyncSession
 ):
     """Test that permissions in one tenant don't grant access in another tenant."""
-    assert hasattr(pytest, "tenant_id"), "Test tenant ID not set in conftest"
-    assert hasattr(pytest, "test_tenant2_id"), "Test tenant2 ID not set"
-    assert hasattr(pytest, "user2_id"), "Test user2 ID not set in conftest"
-    assert hasattr(pytest, "test_role_single_perm_id"), "Test role ID not set"
     
-    tenant1_id = pytest.tenant_id
-    tenant2_id = pytest.test_tenant2_id
-    user_id = pytest.user2_id
-    role_id = pytest.test_role_single_perm_id
+    tenant1_id = setup_test_route["tenant_id"]
+    tenant2_id = setup_test_route["tenant2_id"]
+    user_id = setup_test_route["user2_id"]
+    role_id = setup_test_route["role_single_perm_id"]
     
-    # Reassign the role to the user in tenant1 (in case previous test removed it)
-    # This ensures they have the needed permission in tenant1
-    await user_service.assign_role_to_user_in_tenant(
-        db_session,
-        user_id=user_id,
-        tenant_id=tenant1_id,
-        role_id=role_id
-    )
+    # Make sure the user has the role in tenant1 (a no-op if setup's assignment is in place)
+    await _assign_roles(db_session, (user_id, tenant1_id, role_id))
     
     # User should have access in tenant1
     response = await authenticated_async_client_user2.get(f"/test-deps/test-permission/{tenant1_id}")
@@ -463,9 +377,8 @@ async def test_tenant_isolation(
     assert response.status_code == status.HTTP_403_FORBIDDEN, f"Expected 403 for tenant2, got: {response.status_code}"
 
 
-@pytest.mark.asyncio
 async def test_nonexistent_tenant(
-    setup_test_route: FastAPI,
+    setup_test_route: dict,
     authenticated_async_client: AsyncClient
 ):
     """Test that using a non-existent tenant ID returns 404."""
@@ -477,9 +390,8 @@ async def test_nonexistent_tenant(
     assert response.status_code == status.HTTP_404_NOT_FOUND, f"Expected 404, got: {response.status_code}"
 
 
-@pytest.mark.asyncio
 async def test_invalid_tenant_id_format(
-    setup_test_route: FastAPI,
+    setup_test_route: dict,
     authenticated_async_client: AsyncClient
 ):
     """Test that an invalid tenant ID format returns 400."""
@@ -491,92 +403,64 @@ async def test_invalid_tenant_id_format(
     assert response.status_code == status.HTTP_400_BAD_REQUEST, f"Expected 400, got: {response.status_code}"
 
 
-@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "endpoint",
+    ["test-missing-tenant-id-single", "test-missing-tenant-id-any", "test-missing-tenant-id-all"],
+)
 async def test_missing_tenant_id_in_path(
-    setup_test_route: FastAPI,
+    endpoint: str,
+    setup_test_route: dict,
     authenticated_async_client: AsyncClient
 ):
     """Test that endpoints missing tenant_id in path return 400."""
-    # Test all three dependency types
-    response = await authenticated_async_client.get("/test-deps/test-missing-tenant-id-single")
-    assert response.status_code == status.HTTP_400_BAD_REQUEST, f"Expected 400 for require_permission, got: {response.status_code}"
-    
-    response = await authenticated_async_client.get("/test-deps/test-missing-tenant-id-any")
-    assert response.status_code == status.HTTP_400_BAD_REQUEST, f"Expected 400 for require_any_permission, got: {response.status_code}"
-    
-    response = await authenticated_async_client.get("/test-deps/test-missing-tenant-id-all")
-    assert response.status_code == status.HTTP_400_BAD_REQUEST, f"Expected 400 for require_all_permissions, got: {response.status_code}"
+    response = await authenticated_async_client.get(f"/test-deps/{endpoint}")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, f"Expected 400 for {endpoint}, got: {response.status_code}"
 
 
-@pytest.mark.asyncio
 async def test_require_all_permissions(
-    setup_test_route: FastAPI,
+    setup_test_route: dict,
     authenticated_async_client_user2: AsyncClient,
     db_session: AsyncSession
 ):
     """Test that require_all_permissions correctly requires all listed permissions."""
-    assert hasattr(pytest, "tenant_id"), "Test tenant ID not set in conftest"
-    assert hasattr(pytest, "user2_id"), "Test user2 ID not set in conftest"
-    assert hasattr(pytest, "test_role_multiple_perms_id"), "Multiple permissions role ID not set"
     
-    tenant_id = pytest.tenant_id
-    user_id = pytest.user2_id
-    role_id = pytest.test_role_multiple_perms_id
+    tenant_id = setup_test_route["tenant_id"]
+    user_id = setup_test_route["user2_id"]
+    role_id = setup_test_route["role_multiple_perms_id"]
     
     # First test without the role assigned - should be 403
     response = await authenticated_async_client_user2.get(f"/test-deps/test-all-permissions/{tenant_id}")
     assert response.status_code == status.HTTP_403_FORBIDDEN, f"Expected 403 without permissions, got: {response.status_code}"
     
     # Assign the multiple permissions role that has both VM_READ and TENANT_VIEW_USERS
-    await user_service.assign_role_to_user_in_tenant(
-        db_session,
-        user_id=user_id,
-        tenant_id=tenant_id,
-        role_id=role_id
-    )
+    await _assign_roles(db_session, (user_id, tenant_id, role_id))
     
     # Now they should have access
     response = await authenticated_async_client_user2.get(f"/test-deps/test-all-permissions/{tenant_id}")
     assert response.status_code == status.HTTP_200_OK, f"Access failed after assigning all required permissions: {response.text}"
 
 
-@pytest.mark.asyncio
 async def test_require_any_permission(
-    setup_test_route: FastAPI,
+    setup_test_route: dict,
     authenticated_async_client_user2: AsyncClient,
     db_session: AsyncSession
 ):
     """Test that require_any_permission correctly requires at least one of the listed permissions."""
-    assert hasattr(pytest, "tenant_id"), "Test tenant ID not set in conftest"
-    assert hasattr(pytest, "user2_id"), "Test user2 ID not set in conftest"
-    assert hasattr(pytest, "test_role_single_perm_id"), "Single permission role ID not set"
     
-    tenant_id = pytest.tenant_id
-    user_id = pytest.user2_id
-    role_id = pytest.test_role_single_perm_id  # Role with just VM_READ
+    tenant_id = setup_test_route["tenant_id"]
+    user_id = setup_test_route["user2_id"]
+    role_id = setup_test_route["role_single_perm_id"]  # Role with just VM_READ
     
     # Assign the single permission role to the user (VM_READ only)
-    await user_service.assign_role_to_user_in_tenant(
-        db_session,
-        user_id=user_id,
-        tenant_id=tenant_id,
-        role_id=role_id
-    )
+    await _assign_roles(db_session, (user_id, tenant_id, role_id))
     
     # They should have access since VM_READ is one of the listed permissions
     response = await authenticated_async_client_user2.get(f"/test-deps/test-any-permission/{tenant_id}")
     assert response.status_code == status.HTTP_200_OK, f"Access failed with VM_READ permission: {response.text}"
     
     # Remove the role assignment
-    delete_stmt = user_tenant_roles_table.delete().where(
-        and_(
-            user_tenant_roles_table.c.user_id == user_id,
-            user_tenant_roles_table.c.tenant_id == tenant_id,
-            user_tenant_roles_table.c.role_id == role_id
-        )
-    )
-    await db_session.execute(delete_stmt)
-    await db_session.commit()
+    # No commit needed: requests run on this same per-test session, which is rolled back afterwards
+    await db_session.execute(_UNASSIGN_STMT, {"uid": user_id, "tid": tenant_id, "rid": role_id})
     
     # Create a role with only TENANT_VIEW_USERS (another permission in the any list)
     role_tenant_view = await role_service.create(
@@ -584,26 +468,29 @@ async def test_require_any_permission(
         obj_in={"name": f"Tenant View Role {uuid4()}", "tenant_id": tenant_id}
     )
     
-    # Add TENANT_VIEW_USERS permission to the role
-    tenant_view_users_perm = await permission_service.get_by_code(
-        db_session,
-        code=Permission.TENANT_VIEW_USERS.value
-    )
-    
+    # Add TENANT_VIEW_USERS permission to the role (ID looked up once by setup_test_route)
     await role_service.add_permission_to_role(
         db_session,
         role_id=role_tenant_view.id,
-        permission_id=tenant_view_users_perm.id
+        permission_id=setup_test_route["permission_ids"][Permission.TENANT_VIEW_USERS.value]
     )
     
     # Assign this role to the user
-    await user_service.assign_role_to_user_in_tenant(
-        db_session,
-        user_id=user_id,
-        tenant_id=tenant_id,
-        role_id=role_tenant_view.id
-    )
+    await _assign_roles(db_session, (user_id, tenant_id, role_tenant_view.id))
     
     # They should still have access with a different permission from the list
     response = await authenticated_async_client_user2.get(f"/test-deps/test-any-permission/{tenant_id}")
-    assert response.status_code == status.HTTP_200_OK, f"Access failed with TENANT_VIEW_USERS permission: {response.text}" 
\ No newline at end of file
+    assert response.status_code == status.HTTP_200_OK, f"Access failed with TENANT_VIEW_USERS permission: {response.text}" 
+
+@pytest.mark.parametrize(
+    "dependency",
+    [
+        require_tenant_no_bypass,
+        require_any_permission([Permission.VM_READ, Permission.VM_UPDATE]),
+        require_all_permissions([Permission.VM_READ, Permission.VM_UPDATE]),
+    ],
+    ids=["tenant-no-bypass", "require-any", "require-all"],
+)
+def test_permission_dependencies_are_coroutines(dependency):
+    """Permission dependencies must be async so FastAPI awaits them instead of using its threadpool."""
+    assert inspect.iscoroutinefunction(dependency)
@@ -2,12 +2,15 @@ from uuid import uuid4
 
 from fastapi import status
 from httpx import AsyncClient
-import pytest
 from sqlalchemy import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 import pytest_asyncio
 
+from virtualstack.core.permissions import Permission
+from virtualstack.models.iam.role import Role
+from virtualstack.models.iam.role_permissions import role_permissions_table
+
 
 # Test data
 # TEST_ROLE = {"name": f"pytest-role-{uuid4()}", "description": "Role created via pytest"} # Old test data
@@ -15,36 +18,23 @@ import pytest_asyncio
 # Use a UUID for the tenant_id placeholder (though roles are global now)
 # TEST_TENANT_ID = uuid4()
 
-# Store a known permission ID from the seeded data (found via code inspection)
-# TODO: Ideally, create a fixture or helper to fetch a specific seeded permission ID
-# Using vm:read for now
+# Seeded permission IDs come from the session-scoped seeded_perms fixture (conftest.py)
 # seeded_permission_id_vm_read = "f420e148-166e-4601-8a3f-e9f1b9479d31" # REMOVED HARDCODED ID
 
 @pytest_asyncio.fixture(scope="function")
-async def test_role(authenticated_async_client: AsyncClient) -> dict:
-    """Fixture to create a role via API and clean it up afterwards."""
-    role_data = {
-        "name": f"Fixture Role {uuid4()}",
-        "description": "A role created by the test_role fixture",
-        "permissions": [],
-    }
-    created_role = None
-    try:
-        response = await authenticated_async_client.post("/api/v1/roles/", json=role_data)
-        response.raise_for_status()  # Raise exception for bad status codes
-        created_role = response.json()
-        assert "id" in created_role
-        yield created_role
-    finally:
-        if created_role and "id" in created_role:
-            role_id = created_role["id"]
-            print(f"\nCleaning up role ID: {role_id}")
-            delete_response = await authenticated_async_client.delete(f"/api/v1/roles/{role_id}")
-            if delete_response.status_code not in [status.HTTP_204_NO_CONTENT, status.HTTP_404_NOT_FOUND]:
-                print(f"WARNING: Failed to cleanup role {role_id}. Status: {delete_response.status_code}, Text: {delete_response.text}")
-
-
-@pytest.mark.asyncio
+async def test_role(db_session: AsyncSession) -> dict:
+    """Fixture to insert a global role directly; the per-test transaction rollback removes it afterwards.
+
+    The row goes through the same per-test session the endpoints use, so requests see it
+    without an extra POST (role creation itself is covered by test_create_role).
+    """
+    role = Role(name=f"Fixture Role {uuid4()}", description="A role created by the test_role fixture")
+    db_session.add(role)
+    await db_session.flush() # Assigns the ID without committing
+    # Shape it like the role API's JSON (string ID) so tests can compare against responses
+    return {"id": str(role.id), "name": role.name, "description": role.description}
+
+
 async def test_create_role(authenticated_async_client: AsyncClient):
     """Test creating a new role."""
     role_data = {
@@ -57,17 +47,11 @@ async def test_create_role(authenticated_async_client: AsyncClient):
     data = response.json()
     assert data["name"] == role_data["name"]
     assert "id" in data
-    # pytest.role_id = data["id"] # --- REMOVED --- Store for subsequent tests
-    # Cleanup is handled by deleting the role if created by fixture, or manually if needed.
-    # For this specific test, we might want to delete the role it created.
-    role_id_to_delete = data["id"]
-    await authenticated_async_client.delete(f"/api/v1/roles/{role_id_to_delete}")
+    # No cleanup: the per-test transaction rollback (conftest db_session) removes the role.
 
 
-@pytest.mark.asyncio
 async def test_get_role_by_id(authenticated_async_client: AsyncClient, test_role: dict):
     """Test getting a role by ID using the test_role fixture."""
-    # assert hasattr(pytest, "role_id"), "Role ID not set from previous test" # REMOVED
     role_id = test_role["id"]
     response = await authenticated_async_client.get(f"/api/v1/roles/{role_id}")
     assert response.status_code == status.HTTP_200_OK, f"Failed: {response.text}"
@@ -76,7 +60,6 @@ async def test_get_role_by_id(authenticated_async_client: AsyncClient, test_role
     assert data["name"] == test_role["name"]
 
 
-@pytest.mark.asyncio
 async def test_list_roles_for_tenant(authenticated_async_client: AsyncClient, test_role: dict):
     """Test listing global roles, ensuring the fixture role is present."""
     # Role ID must exist from the fixture
@@ -91,7 +74,6 @@ async def test_list_roles_for_tenant(authenticated_async_client: AsyncClient, te
     assert found, f"Fixture role {role_id} not found in global list"
 
 
-@pytest.mark.asyncio
 async def test_update_role(authenticated_async_client: AsyncClient, test_role: dict):
     """Test updating a role using the test_role fixture."""
     role_id = test_role["id"]
@@ -103,18 +85,6 @@ async def test_update_role(authenticated_async_client: AsyncClient, test_role: d
     assert data["description"] == update_data["description"]
     assert data["name"] == test_role["name"] # Name should not change
 
-# --- SKIPPED TESTS REMAIN --- 
-@pytest.mark.skip(reason="Permission assignment service logic is currently disabled")
-def test_add_permission_to_role():
-    """Test adding a permission to a role (currently skipped)."""
-
-
-@pytest.mark.skip(reason="Permission assignment service logic is currently disabled")
-def test_remove_permission_from_role():
-    """Test removing a permission from a role (currently skipped)."""
-
-
-@pytest.mark.asyncio
 async def test_delete_role(authenticated_async_client: AsyncClient):
     """Test deleting a role (creates its own role for deletion)."""
     # Create a role specifically for this test to delete
@@ -132,24 +102,22 @@ async def test_delete_role(authenticated_async_client: AsyncClient):
     response = await authenticated_async_client.delete(f"/api/v1/roles/{role_id}")
     assert response.status_code == status.HTTP_204_NO_CONTENT, f"Failed: {response.text}"
 
-    # Verify the role is actually deleted
+    # Verify the role is actually deleted. The check depends on the DELETE having finished, and
+    # every request here shares the per-test db_session, so requests run one at a time (see conftest)
     response_get = await authenticated_async_client.get(f"/api/v1/roles/{role_id}")
     assert response_get.status_code == status.HTTP_404_NOT_FOUND
 
 # --- Role Permission Tests (using fixture) --- 
 
-@pytest.mark.asyncio
 async def test_add_permission_to_role_success(
     authenticated_async_client: AsyncClient,
     db_session: AsyncSession, # Inject db for verification
     test_role: dict, # Use the fixture role
-    seed_data: dict # Inject seeded data to get permission ID
+    seeded_perms: dict # Seeded permission IDs by code
 ) -> None:
     """Test successfully adding a permission to the fixture role."""
     role_id = test_role["id"]
-    # Use the seeded permission ID from seed_data fixture
-    permission_id_to_add = seed_data.get("vm_read_permission_id")
-    assert permission_id_to_add is not None, "vm:read permission ID was not found in seed_data fixture results."
+    permission_id_to_add = seeded_perms[Permission.VM_READ.value]
 
     endpoint = f"/api/v1/roles/{role_id}/permissions"
     response = await authenticated_async_client.post(
@@ -160,7 +128,6 @@ async def test_add_permission_to_role_success(
     assert response.status_code == status.HTTP_204_NO_CONTENT, f"Failed: {response.text}"
 
     # Verify in DB
-    from virtualstack.models.iam.role_permissions import role_permissions_table
     stmt = select(role_permissions_table).where(
         and_(
             role_permissions_table.c.role_id == uuid.UUID(role_id),
@@ -174,25 +141,20 @@ async def test_add_permission_to_role_success(
     # Compare string representations for UUIDs from different sources
     assert str(association.permission_id) == str(permission_id_to_add)
 
-@pytest.mark.asyncio
 async def test_list_role_permissions_success(
     authenticated_async_client: AsyncClient,
+    db_session: AsyncSession, # Inject db to link the permission directly
     test_role: dict, # Use the fixture role
-    seed_data: dict # Inject seeded data to get permission ID
+    seeded_perms: dict # Seeded permission IDs by code
 ) -> None:
     """Test listing permissions for the fixture role after adding one."""
     role_id = test_role["id"]
-    # Use the seeded permission ID from seed_data fixture
-    permission_id_added = seed_data.get("vm_read_permission_id")
-    assert permission_id_added is not None, "vm:read permission ID was not found in seed_data fixture results."
-
-    # Add the permission first for this isolated test
-    add_endpoint = f"/api/v1/roles/{role_id}/permissions"
-    add_response = await authenticated_async_client.post(
-        add_endpoint,
-        json={"permission_id": str(permission_id_added)}
+    permission_id_added = seeded_perms[Permission.VM_READ.value]
+
+    # Link the permission directly for this isolated test (the endpoint under test is the GET)
+    await db_session.execute(
+        role_permissions_table.insert().values(role_id=uuid.UUID(role_id), permission_id=permission_id_added)
     )
-    assert add_response.status_code == status.HTTP_204_NO_CONTENT, "Setup failed: Could not add permission"
 
     # Now list
     list_endpoint = f"/api/v1/roles/{role_id}/permissions"
@@ -205,29 +167,22 @@ async def test_list_role_permissions_success(
     found = any(str(item.get("id")) == str(permission_id_added) for item in permissions_list)
     assert found, f"Permission {permission_id_added} not found in list for role {role_id}: {permissions_list}"
 
-@pytest.mark.asyncio
 async def test_remove_permission_from_role_success(
     authenticated_async_client: AsyncClient,
     db_session: AsyncSession, # Inject db for verification
     test_role: dict, # Use the fixture role
-    seed_data: dict # Inject seeded data to get permission ID
+    seeded_perms: dict # Seeded permission IDs by code
 ) -> None:
     """Test successfully removing a permission from the fixture role."""
     role_id = test_role["id"]
-    # Use the seeded permission ID from seed_data fixture
-    permission_id_to_remove = seed_data.get("vm_read_permission_id")
-    assert permission_id_to_remove is not None, "vm:read permission ID was not found in seed_data fixture results."
-
-    # Add the permission first to ensure it exists
-    add_endpoint = f"/api/v1/roles/{role_id}/permissions"
-    add_response = await authenticated_async_client.post(
-        add_endpoint,
-        json={"permission_id": str(permission_id_to_remove)}
+    permission_id_to_remove = seeded_perms[Permission.VM_READ.value]
+
+    # Link the permission directly first to ensure it exists (the endpoint under test is the DELETE)
+    await db_session.execute(
+        role_permissions_table.insert().values(role_id=uuid.UUID(role_id), permission_id=permission_id_to_remove)
     )
-    assert add_response.status_code == status.HTTP_204_NO_CONTENT, "Setup failed: Could not add permission"
 
     # Verify it exists before delete (belt and suspenders)
-    from virtualstack.models.iam.role_permissions import role_permissions_table
     stmt_check = select(role_permissions_table).where(
         and_(
             role_permissions_table.c.role_id == uuid.UUID(role_id),
@@ -259,7 +214,6 @@ async def test_remove_permission_from_role_success(
 
 # TODO: Add failure tests for role permission management (e.g., add non-existent permission, remove non-assigned permission)
 
-@pytest.mark.asyncio
 async def test_update_role_users(authenticated_async_client: AsyncClient, test_role: dict, seed_data: dict):
     """Test updating a role's assigned users."""
     role_id = test_role["id"]
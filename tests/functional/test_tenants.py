@@ -1,84 +1,73 @@
-# Remove unused db_session import if it's not used elsewhere after removing from params
-# from sqlalchemy.ext.asyncio import AsyncSession
-from uuid import uuid4
+import os
 
 from fastapi import status
 from httpx import AsyncClient  # Import AsyncClient
 import pytest
 
 
-# Test data
-TEST_TENANT_NAME = f"pytest-tenant-{uuid4()}"
-TEST_TENANT_SLUG = TEST_TENANT_NAME  # Use name as slug, fits the pattern
-TEST_TENANT_DATA = {
-    "name": TEST_TENANT_NAME,
-    "slug": TEST_TENANT_SLUG,  # TODO: Verify if slug generation logic should be different in production
-    "description": "Tenant created via pytest",
-}
+# Endpoint path used by every step; the per-tenant URL is built once the ID is known
+TENANTS_URL = "/api/v1/tenants/"
 
-# Mark tests as asyncio
-pytestmark = pytest.mark.asyncio
+# Test data: names are stable per xdist worker rather than random per run. Each worker
+# gets its own database (<db>_<worker>), and the per-test rollback discards the created rows.
+_WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "master")
+TEST_TENANT_NAME = f"pytest-tenant-{_WORKER_ID}"
 
-# Use async def and await, use authenticated_async_client
+@pytest.fixture(scope="function")
+def tenant_data() -> dict:
+    """Tenant payload for the create call (a fresh dict per test)."""
+    tenant_name = TEST_TENANT_NAME
+    return {
+        "name": tenant_name,
+        "slug": tenant_name,  # Use name as slug, fits the pattern # TODO: Verify if slug generation logic should be different in production
+        "description": "Tenant created via pytest",
+    }
 
+# Use async def and await, use authenticated_async_client
 
-async def test_create_tenant(authenticated_async_client: AsyncClient):
-    """Test creating a new tenant using an authenticated async client."""
-    response = await authenticated_async_client.post("/api/v1/tenants/", json=TEST_TENANT_DATA)
+# One test walks the whole create -> list -> get -> update -> delete journey, paying fixture
+# setup/teardown once. The steps build on each other, so they run in order. Every write is
+# rolled back by the conftest db_session afterwards.
+async def test_tenant_lifecycle(authenticated_async_client: AsyncClient, tenant_data: dict):
+    """Test creating, listing, getting, updating and deleting a tenant."""
+    # --- Create ---
+    response = await authenticated_async_client.post(TENANTS_URL, json=tenant_data)
     assert response.status_code == status.HTTP_201_CREATED, response.text
     data = response.json()
-    assert data["name"] == TEST_TENANT_DATA["name"]
+    assert data["name"] == tenant_data["name"]
     assert "id" in data
-    pytest.tenant_id = data["id"]  # Store tenant ID for subsequent tests
-
+    tenant_id = data["id"]
+    tenant_url = f"{TENANTS_URL}{tenant_id}"
 
-async def test_get_tenants(authenticated_async_client: AsyncClient):
-    """Test retrieving tenants (should include the one created)."""
-    assert hasattr(pytest, "tenant_id"), "Tenant ID not set from previous test"
-
-    response = await authenticated_async_client.get("/api/v1/tenants/")
+    # --- List (should include the created tenant) ---
+    response = await authenticated_async_client.get(TENANTS_URL)
     assert response.status_code == status.HTTP_200_OK, response.text
     data = response.json()
     assert isinstance(data, list)
-    found = any(item["id"] == str(pytest.tenant_id) for item in data)
+    found = any(item["id"] == tenant_id for item in data)
     assert found, "Created tenant not found in list"
 
-
-async def test_get_tenant_by_id(authenticated_async_client: AsyncClient):
-    """Test getting a specific tenant by ID."""
-    assert hasattr(pytest, "tenant_id"), "Tenant ID not set from previous test"
-    tenant_id = pytest.tenant_id
-
-    response = await authenticated_async_client.get(f"/api/v1/tenants/{tenant_id}")
+    # --- Get by ID ---
+    response = await authenticated_async_client.get(tenant_url)
     assert response.status_code == status.HTTP_200_OK, response.text
     data = response.json()
-    assert data["id"] == str(tenant_id)
-    assert data["name"] == "Test Tenant"
-
+    assert data["id"] == tenant_id
+    assert data["name"] == tenant_data["name"]
 
-async def test_update_tenant(authenticated_async_client: AsyncClient):
-    """Test updating a tenant."""
-    assert hasattr(pytest, "tenant_id"), "Tenant ID not set from previous test"
-    tenant_id = pytest.tenant_id
+    # --- Update ---
     update_data = {"description": "Updated via pytest"}
-
     response = await authenticated_async_client.put(
-        f"/api/v1/tenants/{tenant_id}", json=update_data
+        tenant_url, json=update_data
     )
     assert response.status_code == status.HTTP_200_OK, response.text
     data = response.json()
-    assert data["id"] == str(tenant_id)
+    assert data["id"] == tenant_id
     assert data["description"] == update_data["description"]
 
-
-async def test_delete_tenant(authenticated_async_client: AsyncClient):
-    """Test deleting a tenant."""
-    assert hasattr(pytest, "tenant_id"), "Tenant ID not set from previous test"
-    tenant_id = pytest.tenant_id
-
-    response = await authenticated_async_client.delete(f"/api/v1/tenants/{tenant_id}")
+    # --- Delete ---
+    response = await authenticated_async_client.delete(tenant_url)
     assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
 
     # Verify it's gone
-    response_get = await authenticated_async_client.get(f"/api/v1/tenants/{tenant_id}")
+    response_get = await authenticated_async_client.get(tenant_url)
     assert response_get.status_code == status.HTTP_404_NOT_FOUND
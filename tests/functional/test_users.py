@@ -1,90 +1,111 @@
-# Remove unused db_session import
-# from sqlalchemy.ext.asyncio import AsyncSession
-from uuid import uuid4
+import logging
+import os
+from typing import AsyncGenerator
 
 from fastapi import status
 from httpx import AsyncClient  # Use AsyncClient
 import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from virtualstack.models.iam import User
+from virtualstack.schemas.iam.user import UserCreate
+from virtualstack.services.iam import user_service
 
-# Test data
-TEST_USER = {
-    "email": f"pytest-user-{uuid4()}@virtualstack.example",  # Ensure unique email
-    "password": "Password123!",
-    "first_name": "Pytest",
-    "last_name": "User",
-}
+logger = logging.getLogger(__name__)
 
-# Mark tests as asyncio and remove skip
-pytestmark = pytest.mark.asyncio
+
+# Endpoint paths used by several tests
+USERS_URL = "/api/v1/users/"
+CURRENT_USER_URL = "/api/v1/users/me"
+
+# Test data: emails are stable per xdist worker rather than random per run. Each worker
+# gets its own database (<db>_<worker>), and the per-test rollback discards the created rows.
+_WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "master")
+TEST_USER_EMAIL = f"pytest-user-{_WORKER_ID}@virtualstack.example"
+MODULE_USER_EMAIL = f"pytest-module-user-{_WORKER_ID}@virtualstack.example"
+
+@pytest.fixture(scope="function")
+def user_data() -> dict:
+    """User payload for the create call (a fresh dict per test)."""
+    return {
+        "email": TEST_USER_EMAIL,  # Distinct from the module user's email
+        "password": "Password123!",
+        "first_name": "Pytest",
+        "last_name": "User",
+    }
 
 # Use async def and await, use authenticated_async_client
 
+# Created once per module and committed through seed_session. Each test's changes (update,
+# delete) are rolled back by the conftest db_session, so every test still sees the row as created.
+@pytest_asyncio.fixture(scope="module")
+async def created_user(seed_session: AsyncSession, seed_data: dict) -> AsyncGenerator[dict, None]:
+    """Creates one user in the seeded tenant for the update/delete tests; removed after the module."""
+    user_in = UserCreate(
+        email=MODULE_USER_EMAIL,
+        password="Password123!",
+        first_name="Pytest",
+        last_name="User",
+    )
+    user = await user_service.create(seed_session, obj_in=user_in, tenant_id=seed_data["tenant"].id)
+    await seed_session.commit()
+    logger.info(f"[Test Setup] Created module user {user.id}.")
+
+    # Shaped like the API response (string ID) so tests compare it against response data directly
+    yield {"id": str(user.id), "email": user.email}
+
+    # Deleting the user cascades to its tenant role assignment
+    await seed_session.execute(delete(User).where(User.id == user.id))
+    await seed_session.commit()
+    logger.info(f"[Test Teardown] Removed module user {user.id}.")
 
-async def test_create_user(
-    authenticated_async_client: AsyncClient,
+
+async def test_user_create_and_read(
+    authenticated_async_client: AsyncClient, user_data: dict
 ):  # Use authenticated_async_client
-    """Test creating a new user."""
-    # Remove mock headers
+    """Test creating a new user, then reading it back by ID and getting current user info."""
     # Remove tenant_id from payload as it's not part of UserCreate schema
-    user_data = TEST_USER  # Directly use TEST_USER
-
     response = await authenticated_async_client.post(  # Use await and add trailing slash
-        "/api/v1/users/", json=user_data
+        USERS_URL, json=user_data
     )
     assert response.status_code == status.HTTP_201_CREATED, response.text
     data = response.json()
-    assert data["email"] == TEST_USER["email"]
-    assert data["first_name"] == TEST_USER["first_name"]
+    assert data["email"] == user_data["email"]
+    assert data["first_name"] == user_data["first_name"]
     assert "id" in data
     assert "hashed_password" not in data  # Ensure password is not returned
+    user_id = data["id"]
 
-    pytest.user_id = data["id"]  # Store user ID for subsequent tests
-    # TODO: Consider using fixtures instead of sequential dependency via pytest.user_id
+    # Read the new user back by ID, then fetch the caller via /me
+    # ('/me' uses the token to find the user, not a specific ID).
+    # Requests run one at a time, since they share the per-test db_session (see conftest)
+    response = await authenticated_async_client.get(f"{USERS_URL}{user_id}")
+    me_response = await authenticated_async_client.get(CURRENT_USER_URL)
 
-
-async def test_get_user_by_id(
-    authenticated_async_client: AsyncClient,
-):  # Use authenticated_async_client
-    """Test getting a user by ID."""
-    assert hasattr(pytest, "user_id"), "User ID not set from previous test"
-    user_id = pytest.user_id
-    # Remove mock headers
-
-    response = await authenticated_async_client.get(f"/api/v1/users/{user_id}")  # Use await
     assert response.status_code == status.HTTP_200_OK, response.text
     data = response.json()
-    assert data["id"] == str(user_id)
-    assert data["email"] == TEST_USER["email"]
+    assert data["id"] == user_id
+    assert data["email"] == user_data["email"]
 
-
-# TODO: Re-evaluate this test - '/me' endpoint requires the *calling* user, not a specific ID
-# This test might need to use the authenticated_async_client without specifying a user_id
-async def test_get_current_user_info(
-    authenticated_async_client: AsyncClient,
-):  # Use authenticated_async_client
-    """Test getting current user info."""
-    # Remove mock headers
-    # This endpoint uses the token to find the user
-    response = await authenticated_async_client.get("/api/v1/users/me")  # Use await
-    assert response.status_code == status.HTTP_200_OK, response.text
-    data = response.json()
-    assert "id" in data
+    assert me_response.status_code == status.HTTP_200_OK, me_response.text
+    me_data = me_response.json()
+    assert "id" in me_data
     # We can assert the ID matches the logged-in user if we retrieve it from the fixture/settings
     # For now, just check if ID exists
 
 
 async def test_update_user(
-    authenticated_async_client: AsyncClient,
+    authenticated_async_client: AsyncClient, created_user: dict
 ):  # Use authenticated_async_client
     """Test updating a user."""
-    assert hasattr(pytest, "user_id"), "User ID not set from previous test"
-    user_id = pytest.user_id
+    user_id = created_user["id"]
     update_data = {"last_name": "User-Updated"}
     # Remove mock headers
 
     response = await authenticated_async_client.put(  # Use await
-        f"/api/v1/users/{user_id}", json=update_data
+        f"{USERS_URL}{user_id}", json=update_data
     )
     assert response.status_code == status.HTTP_200_OK, response.text
     data = response.json()
@@ -94,18 +115,19 @@ async def test_update_user(
 
 
 async def test_delete_user(
-    authenticated_async_client: AsyncClient,
+    authenticated_async_client: AsyncClient, created_user: dict
 ):  # Use authenticated_async_client
     """Test deleting a user."""
-    assert hasattr(pytest, "user_id"), "User ID not set from previous test"
-    user_id = pytest.user_id
+    user_id = created_user["id"]
     # Remove mock headers
 
-    response = await authenticated_async_client.delete(f"/api/v1/users/{user_id}")  # Use await
+    user_url = f"{USERS_URL}{user_id}"
+
+    response = await authenticated_async_client.delete(user_url)  # Use await
     # Assert 204 No Content status code
     assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
 
     # Verify it's gone
-    response_get = await authenticated_async_client.get(f"/api/v1/users/{user_id}")  # Use await
+    response_get = await authenticated_async_client.get(user_url)  # Use await
     assert response_get.status_code == status.HTTP_404_NOT_FOUND
     # TODO: Add test for deleting user's own account via /me endpoint? (If applicable)